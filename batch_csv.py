@@ -1,13 +1,13 @@
 
 import os
-import pandas as pd
+from ingest import read_source
 
 # Paths
 input_csv_path = "data/tepids_cleaned.csv"
 batch_dir = "./batches/"
 os.makedirs(batch_dir, exist_ok=True)
 
-df = pd.read_csv(input_csv_path)
+df = read_source(input_csv_path)
 total_rows = len(df)
 batch_files = []
 
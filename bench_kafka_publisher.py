@@ -0,0 +1,146 @@
+"""
+Benchmark of publish_tep_id_changes against an in-process broker stand-in.
+
+The stand-in mimics the producer side of librdkafka: messages are grouped per partition into batches closed
+by batch.num.messages, batch.size, or on poll once linger.ms passed since the last message produced to the
+partition, each batch is compressed with compression.type and delivery reports are served on poll/flush. It measures the client-side cost (serialization, batching, compression)
+and the bytes sent for our change volumes, not the network or broker.
+
+Usage: python bench_kafka_publisher.py [csv_path] [repeat]
+"""
+import gzip
+import sys
+import time
+import zlib
+from collections import defaultdict
+
+from kafka_tep_id_publisher import publish_tep_id_changes, read_tep_id_changes
+
+COMPRESSORS = {
+    'none': lambda data: data,
+    'gzip': lambda data: gzip.compress(data, compresslevel=6),
+}
+try:
+    import lz4.frame
+    COMPRESSORS['lz4'] = lz4.frame.compress
+except ImportError:
+    pass
+try:
+    import zstandard
+    COMPRESSORS['zstd'] = zstandard.ZstdCompressor().compress
+except ImportError:
+    pass
+
+
+class _StandInMessage:
+    __slots__ = ('_key', '_value')
+
+    def __init__(self, key, value):
+        self._key = key
+        self._value = value
+
+    def key(self):
+        return self._key
+
+    def value(self):
+        return self._value
+
+
+class LocalBrokerStandIn:
+    """Producer-compatible stand-in: produce/poll/flush with batching, compression and delivery callbacks."""
+
+    def __init__(self, config, num_partitions=6):
+        self.compress = COMPRESSORS[config.get('compression.type', 'none')]
+        self.batch_num_messages = int(config.get('batch.num.messages', 10000))
+        self.batch_size = int(config.get('batch.size', 1000000))
+        self.linger = float(config.get('linger.ms', 5)) / 1000
+        self.queue_max = int(config.get('queue.buffering.max.messages', 100000))
+        self.num_partitions = num_partitions
+        self._batches = defaultdict(list)
+        self._batch_bytes = defaultdict(int)
+        self._last_produce = {}
+        self._pending_reports = []
+        self.queued = 0
+        self.raw_bytes = 0
+        self.sent_bytes = 0
+        self.batches_sent = 0
+        self.messages_sent = 0
+
+    def produce(self, topic, key=None, value=None, on_delivery=None):
+        if self.queued >= self.queue_max:
+            raise BufferError("Local: Queue full")
+        partition = zlib.crc32(key) % self.num_partitions
+        batch = self._batches[partition]
+        self._last_produce[partition] = time.perf_counter()
+        batch.append((key, value, on_delivery))
+        self._batch_bytes[partition] += len(key) + len(value)
+        self.queued += 1
+        if len(batch) >= self.batch_num_messages or self._batch_bytes[partition] >= self.batch_size:
+            self._send(partition)
+
+    def _send(self, partition):
+        batch = self._batches.pop(partition, [])
+        self._batch_bytes.pop(partition, None)
+        if not batch:
+            return
+        payload = b''.join(key + value for key, value, _ in batch)
+        self.raw_bytes += len(payload)
+        self.sent_bytes += len(self.compress(payload))
+        self.batches_sent += 1
+        self.messages_sent += len(batch)
+        self._pending_reports.extend(batch)
+
+    def poll(self, timeout=0):
+        now = time.perf_counter()
+        # partitions idle for linger.ms, the producer stopped filling their batch
+        for partition in [p for p, last in self._last_produce.items()
+                          if p in self._batches and now - last >= self.linger]:
+            self._send(partition)
+        served = len(self._pending_reports)
+        for key, value, on_delivery in self._pending_reports:
+            if on_delivery is not None:
+                on_delivery(None, _StandInMessage(key, value))
+        self._pending_reports = []
+        self.queued -= served
+        return served
+
+    def flush(self, timeout=None):
+        for partition in list(self._batches):
+            self._send(partition)
+        self.poll(0)
+        return self.queued
+
+
+def main(csv_path="./prod/right/tep_id_changes.csv", repeat=3):
+    changes = read_tep_id_changes(csv_path)
+    print(f"{len(changes)} tep id changes from {csv_path}")
+    print(f"{'compression':<12}{'batch.num.messages':>20}{'msg/s':>12}{'sent KiB':>12}{'batches':>10}"
+          f"{'msg/batch':>12}{'fill %':>8}")
+
+    for compression in COMPRESSORS:
+        for batch_num_messages in (1000, 10000, 100000):
+            config = {
+                'linger.ms': '10',
+                'queue.buffering.max.messages': '3000000',
+                'compression.type': compression,
+                'batch.num.messages': str(batch_num_messages),
+            }
+            best = None
+            for _ in range(repeat):
+                producer = LocalBrokerStandIn(config)
+                tracker, elapsed = publish_tep_id_changes(producer, 'bench', changes)
+                assert tracker.delivered == len(changes) and tracker.failed == 0
+                if best is None or elapsed < best[0]:
+                    best = (elapsed, producer.sent_bytes, producer.batches_sent, producer.messages_sent,
+                            producer.raw_bytes)
+            elapsed, sent_bytes, batches, messages, raw_bytes = best
+            # average messages per batch, and as a share of batch.num.messages
+            batch_fill = messages / batches if batches else 0.0
+            print(f"{compression:<12}{batch_num_messages:>20}{len(changes) / elapsed:>12.0f}"
+                  f"{sent_bytes / 1024:>12.0f}{batches:>10}{batch_fill:>12.0f}"
+                  f"{100 * batch_fill / batch_num_messages:>8.1f}")
+    print(f"(uncompressed keys + values: {raw_bytes / 1024:.0f} KiB)")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2], *[int(arg) for arg in sys.argv[2:3]])
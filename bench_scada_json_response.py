@@ -0,0 +1,83 @@
+"""
+Microbenchmark of the SCADA response encoding: jsonable_encoder + JSONResponse against ORJSONScadaResponse.
+
+The payload is shaped like a historical aggregated response (signals with min/max/avg/last values). It is
+encoded without exponent-form floats, and with a single one in the last value, which orjson formats
+differently from json: written as an orjson Fragment when the installed orjson supports it, otherwise the
+encoding stops there and the body is rendered by JSONResponse. Every body is checked to be byte identical.
+
+Usage: python bench_scada_json_response.py [n_signals] [n_points] [repeat]
+"""
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, Field
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "scada-utils", "utils"))
+import scada_orjson_response  # noqa: E402
+from scada_orjson_response import ORJSONScadaResponse  # noqa: E402
+
+
+class ItemValue(BaseModel):
+    timestamp: datetime
+    min: Optional[float]
+    max: Optional[float]
+    avg: Optional[float]
+    last: Optional[float]
+
+
+class AggReferenceSignal(BaseModel):
+    name: str
+    tep_id: str = Field(alias="tepId")
+    scada_reference_signal_name: str = Field(alias="scadaReferenceSignalName")
+    offshore_wind_turbine_id: Optional[str] = Field(None, alias="offshoreWindTurbineId")
+    values: List[ItemValue]
+
+
+def build_payload(n_signals, n_points, exponent_float=False):
+    start = datetime(2024, 2, 29, tzinfo=timezone.utc)
+    payload = []
+    for s in range(n_signals):
+        values = [ItemValue(timestamp=start + timedelta(minutes=10 * p), min=p * 0.5, max=p * 1.5 + 0.25,
+                            avg=p + 0.125, last=float(p))
+                  for p in range(n_points)]
+        payload.append(AggReferenceSignal(name=f"DBA.WTG{s:03d}.Rotor.Speed", tepId=f"tep-{s:08d}",
+                                          scadaReferenceSignalName="RotorSpeed", offshoreWindTurbineId=f"WTG{s:03d}",
+                                          values=values))
+    if exponent_float:
+        payload[-1].values[-1].min = 1e-05
+    return payload
+
+
+def best_ms(render, repeat):
+    return min(timeit.repeat(render, number=1, repeat=repeat)) * 1000
+
+
+def main(n_signals=20, n_points=5000, repeat=5):
+    print(f"payload: {n_signals} signals x {n_points} points, orjson {scada_orjson_response.orjson.__version__}")
+    fragment = scada_orjson_response._Fragment
+    cases = [("no exponent float", False, fragment), ("one exponent float, Fragment", True, fragment),
+             ("one exponent float, no Fragment", True, None)]
+    for label, exponent_float, fragment_support in cases:
+        if label.endswith("Fragment") and fragment is None:
+            continue
+        scada_orjson_response._Fragment = fragment_support
+        payload = build_payload(n_signals, n_points, exponent_float)
+        default_body = JSONResponse(content=jsonable_encoder(payload)).body
+        if ORJSONScadaResponse(content=payload).body != default_body:
+            raise SystemExit(f"{label}: ORJSONScadaResponse output differs from JSONResponse")
+
+        default_ms = best_ms(lambda: JSONResponse(content=jsonable_encoder(payload)), repeat)
+        orjson_ms = best_ms(lambda: ORJSONScadaResponse(content=payload), repeat)
+        print(f"{label:<32} {len(default_body)} bytes, jsonable_encoder + JSONResponse {default_ms:.1f} ms, "
+              f"ORJSONScadaResponse {orjson_ms:.1f} ms ({default_ms / orjson_ms:.2f}x), byte identical")
+    scada_orjson_response._Fragment = fragment
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:4]])
@@ -2,14 +2,16 @@ import csv
 
 import pandas as pd
 
+from ingest import read_source
+
 
 def drop_nan_rows(df, column_names):
     return df.dropna(subset=column_names)
 
 
 def merge_csv_files(file1: str, file2: str, columns: list) -> pd.DataFrame:
-    df1 = pd.read_csv(file1)
-    df2 = pd.read_csv(file2)
+    df1 = read_source(file1)
+    df2 = read_source(file2)
     df = pd.concat([df1, df2], ignore_index=True)
     df = df.drop_duplicates(subset=columns, keep='last')
 
@@ -27,7 +29,7 @@ output_file (str): Path to the output CSV file where cleaned data will be saved.
 
 
 def strip_csv2(input_file, column_names, output_file):
-    df = pd.read_csv(input_file)
+    df = read_source(input_file)
     print("Formatted rows:")
 
     for column in column_names:
@@ -43,15 +45,43 @@ def strip_csv2(input_file, column_names, output_file):
 
 
 def swap_and_prepare_csv_for_spk(csv_file_path, output_file_path):
-    df = pd.read_csv(csv_file_path)
-    df = df[['new tep_id', 'old tep_id']]
+    df = read_source(csv_file_path, columns=['new tep_id', 'old tep_id'])
     df.columns = ['sourceTepId', 'targetTepId']
     df.to_csv(output_file_path, index=False)
     print(f"CSV has been processed and saved to {output_file_path}")
 
 
+def prepare_tep_id_alias_csv(csv_file_path, output_file_path):
+    """
+    Keeps old tep_id, new tep_id and createdTimeNewTag of a resolved file (e.g. tagname_tepid_final.csv),
+    used by the SCADA API tep id alias index to stitch historical series at the cutover time.
+    """
+    df = read_source(csv_file_path, columns=['old tep_id', 'new tep_id', 'createdTimeNewTag'])
+    df = drop_nan_rows(df, ['old tep_id', 'new tep_id'])
+    df.to_csv(output_file_path, index=False)
+    print(f"Tep id alias file with {len(df)} rows saved to {output_file_path}")
+
+
+def extract_rename_columns(input_file, output_file, column_names=("Dgraph Name", "New Name"), sheet_name=0):
+    """
+    Keeps only the old and new name columns of a raw rename source (xlsx, or csv with Reason 1-4/Comment columns),
+    without rows missing a name and with names stripped.
+    """
+    column_names = list(column_names)
+    df = read_source(input_file, columns=column_names, sheet_name=sheet_name)
+    df = drop_nan_rows(df, column_names)
+    for column in column_names:
+        df[column] = df[column].str.strip()
+    df.to_csv(output_file, index=False)
+    print(f"{len(df)} renames of {input_file} saved to {output_file}")
+
+
+# extract_rename_columns("./RAW-data/tag_name_changes2.csv", "./RAW-data/tag_name_changes2Cleaned.csv")
+
 # swap_and_prepare_csv_for_spk("./prod/right/tep_id_changes.csv", "./prod/right/tep_id_changes_spk.csv")
 
+# prepare_tep_id_alias_csv("./prod/right/tagname_tepid_final.csv", "./prod/right/tep_id_aliases.csv")
+
 # csv_file = "./prod/right/tag_name_changes.csv"
 # df = pd.read_csv(csv_file)
 
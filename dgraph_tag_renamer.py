@@ -0,0 +1,279 @@
+import argparse
+import csv
+import json
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+
+from redis_tag_updater import read_tag_changes, tag_change_levels
+from utils import get_access_token
+
+mutation_template = """
+mutation {
+$mutations
+}"""
+
+update_template = "    r$index: updateScadaSignal(input: {filter: {name: {eq: $old_name}}, set: {name: $new_name}}) { numUids }"
+
+names_query_template = """
+{
+    queryScadaSignal(filter: { name: { in: $names } }) {
+        name
+    }
+}"""
+
+# connect, read timeouts of every request, in seconds
+REQUEST_TIMEOUT = (10, 120)
+
+
+def build_rename_mutation(batch):
+    """Build one GraphQL request renaming every (old, new) pair of the batch through aliased updateScadaSignal."""
+    mutations = [
+        update_template.replace("$index", str(i))
+        .replace("$old_name", json.dumps(old_name))
+        .replace("$new_name", json.dumps(new_name))
+        for i, (old_name, new_name) in enumerate(batch)
+    ]
+    return mutation_template.replace("$mutations", "\n".join(mutations))
+
+
+def is_aborted_error(error):
+    """Dgraph aborts a mutation's transaction when it conflicts with a concurrent one, retrying it is safe."""
+    return 'aborted' in str(error.get('message', '')).lower()
+
+
+class DgraphTagRenamer:
+    """
+    Batched, concurrent renames of ScadaSignal names in Dgraph.
+
+    Each batch is a single GraphQL request of aliased updateScadaSignal mutations, up to `concurrency` batches
+    are in flight at once. Chained renames (A -> B, B -> C) run in successive levels so B -> C is applied
+    before a second signal is named B. Every alias is checked for numUids == 1, successful renames are appended to a
+    rollback file (with old and new swapped, so it can be fed back as a change file) as soon as their batch
+    completes.
+
+    Only the aliases that still need it are retried: those whose transaction was aborted by Dgraph, and after
+    a request that may have reached Dgraph without an answer (timeout, connection drop, 5xx), those whose
+    rename is not visible yet. Renames that were applied by such a request are found by querying the old and
+    new names, and are counted and recorded for rollback like any other rename.
+    """
+
+    def __init__(self, graphql_endpoint, scope, batch_size=100, concurrency=4, max_retries=5,
+                 rollback_file="dgraph_rename_rollback.csv", timeout=REQUEST_TIMEOUT, retry_delay=2):
+        self.graphql_endpoint = graphql_endpoint
+        self.scope = scope
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.rollback_file = rollback_file
+        self.timeout = timeout
+        self.retry_delay = retry_delay
+        self._access_token = None
+        self._token_lock = threading.Lock()
+        self._rollback_lock = threading.Lock()
+        self._local = threading.local()
+
+    def _headers(self, refresh=False):
+        with self._token_lock:
+            if refresh or self._access_token is None:
+                self._access_token = get_access_token(self.scope)
+                if not self._access_token:
+                    raise RuntimeError("Failed to retrieve access token.")
+            return {'Authorization': f'Bearer {self._access_token}', 'Content-Type': 'application/json'}
+
+    def _session(self):
+        if not hasattr(self._local, 'session'):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def _post(self, query):
+        """
+        Post one GraphQL request, retrying requests that failed before reaching Dgraph.
+
+        Returns:
+        - dict: The response, None when no request succeeded.
+        - bool: Whether a failed request may have been applied (timeout, connection drop, 5xx).
+        """
+        refresh = False
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                response = self._session().post(self.graphql_endpoint, json={'query': query},
+                                                headers=self._headers(refresh), timeout=self.timeout)
+                if response.status_code == 200:
+                    return response.json(), False
+                print(f"Attempt {attempt}/{self.max_retries} failed. "
+                      f"Status Code: {response.status_code}, Response: {response.text}")
+                refresh = response.status_code in (401, 403)
+                if response.status_code >= 500:
+                    return None, True
+            except requests.ConnectTimeout as e:
+                # never sent
+                print(f"Error posting request on attempt {attempt}: {e}")
+            except requests.RequestException as e:
+                print(f"Error posting request on attempt {attempt}: {e}")
+                return None, True
+            if attempt < self.max_retries:
+                time.sleep(self.retry_delay)
+        return None, False
+
+    def _existing_names(self, names):
+        data, _ = self._post(names_query_template.replace("$names", json.dumps(sorted(set(names)))))
+        if data is None or data.get('errors'):
+            return None
+        return {record['name'] for record in (data.get('data') or {}).get('queryScadaSignal') or []}
+
+    def _applied_renames(self, batch):
+        """Pairs of the batch whose new name exists and old name no longer does, None when unknown."""
+        existing = self._existing_names([name for pair in batch for name in pair])
+        if existing is None:
+            return None
+        return [(old, new) for old, new in batch if new in existing and old not in existing]
+
+    def _rename_batch(self, batch):
+        statuses = {}
+        pending = list(batch)
+        for attempt in range(1, self.max_retries + 1):
+            data, ambiguous = self._post(build_rename_mutation(pending))
+            if data is None:
+                if not ambiguous:
+                    break
+                applied = self._applied_renames(pending)
+                if applied is None:
+                    break
+                for pair in applied:
+                    statuses[pair] = 'renamed'
+                pending = [pair for pair in pending if pair not in statuses]
+            else:
+                results = data.get('data') or {}
+                errors_by_alias = {}
+                for error in data.get('errors') or []:
+                    path = error.get('path') or [None]
+                    errors_by_alias.setdefault(path[0], []).append(error)
+                retry = []
+                for i, (old_name, new_name) in enumerate(pending):
+                    result = results.get(f"r{i}")
+                    num_uids = result.get('numUids') if result else None
+                    alias_errors = errors_by_alias.get(f"r{i}", [])
+                    if num_uids is None and alias_errors and all(is_aborted_error(e) for e in alias_errors):
+                        retry.append((old_name, new_name))
+                    elif num_uids == 1:
+                        statuses[(old_name, new_name)] = 'renamed'
+                    elif num_uids == 0:
+                        statuses[(old_name, new_name)] = 'not_found'
+                    elif num_uids is None:
+                        print(f"GraphQL errors renaming '{old_name}': {alias_errors or data.get('errors')}")
+                        statuses[(old_name, new_name)] = 'error'
+                    else:
+                        # several signals carried the old name and were all renamed
+                        statuses[(old_name, new_name)] = f'renamed_{num_uids}'
+                pending = retry
+            if not pending:
+                break
+            print(f"Retrying {len(pending)} renames of the batch starting with '{batch[0][0]}' "
+                  f"(attempt {attempt}/{self.max_retries})")
+            if attempt < self.max_retries:
+                time.sleep(self.retry_delay)
+
+        for pair in pending:
+            statuses.setdefault(pair, 'request_failed')
+        return [(old_name, new_name, statuses[(old_name, new_name)]) for old_name, new_name in batch]
+
+    def _record_rollback(self, statuses):
+        renamed = [(new, old) for old, new, status in statuses if status.startswith('renamed')]
+        if not renamed:
+            return
+        with self._rollback_lock, open(self.rollback_file, 'a', newline='') as file:
+            csv.writer(file).writerows(renamed)
+
+    def rename(self, tag_changes):
+        """
+        Rename all (old, new) tag pairs.
+
+        As in redis_tag_updater.apply_tag_renames, new names targeted by several old names are not renamed
+        (duplicate_new), and a rename whose new name is the old name of a rename that did not succeed is not
+        run (chain_blocked), so no two signals end up with the same name.
+
+        Returns:
+        - dict: Counts per status, batches, elapsed seconds and renames per second.
+        - list of tuples: (old, new, status) of every pair that was not renamed exactly once.
+        """
+        with open(self.rollback_file, 'w', newline='') as file:
+            csv.writer(file).writerow(['OldTagName', 'NewTagName'])
+
+        unique_changes = list(dict.fromkeys(tag_changes))
+        new_counts = Counter(new for _, new in unique_changes)
+        failures = [(old_name, new_name, 'duplicate_new') for old_name, new_name in unique_changes
+                    if new_counts[new_name] > 1]
+        levels, _, unordered = tag_change_levels([(old, new) for old, new in unique_changes if new_counts[new] == 1])
+        failures.extend((old_name, new_name, 'cycle') for old_name, new_name in unordered)
+        # old names of the renames not applied, renaming another signal to one of them would duplicate it
+        blocked_old = {old_name for old_name, _, _ in failures}
+        stats = {'batches': 0, 'levels': len(levels), 'duplicate_new': len(failures) - len(unordered),
+                 'cycle': len(unordered)}
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for level in levels:
+                runnable = []
+                for old_name, new_name in level:
+                    if new_name in blocked_old:
+                        failures.append((old_name, new_name, 'chain_blocked'))
+                        stats['chain_blocked'] = stats.get('chain_blocked', 0) + 1
+                        blocked_old.add(old_name)
+                    else:
+                        runnable.append((old_name, new_name))
+                batches = [runnable[i:i + self.batch_size] for i in range(0, len(runnable), self.batch_size)]
+                futures = [executor.submit(self._rename_batch, batch) for batch in batches]
+                for future in as_completed(futures):
+                    statuses = future.result()
+                    self._record_rollback(statuses)
+                    stats['batches'] += 1
+                    for old_name, new_name, status in statuses:
+                        stats[status] = stats.get(status, 0) + 1
+                        if status != 'renamed':
+                            failures.append((old_name, new_name, status))
+                        if not status.startswith('renamed'):
+                            blocked_old.add(old_name)
+                    if stats['batches'] % 10 == 0:
+                        print(f"{stats['batches']} batches done")
+
+        stats['elapsed_seconds'] = time.perf_counter() - start
+        stats['renames_per_second'] = len(tag_changes) / stats['elapsed_seconds'] if stats['elapsed_seconds'] else 0
+        return stats, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rename ScadaSignal names in Dgraph with batched mutations.")
+    parser.add_argument("--csv-path", required=True)
+    parser.add_argument("--old-col-name", default="OldTagName")
+    parser.add_argument("--new-col-name", default="NewTagName")
+    parser.add_argument("--separator", default=",")
+    parser.add_argument("--graphql-endpoint", required=True)
+    parser.add_argument("--scope", required=True)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--rollback-file", default="dgraph_rename_rollback.csv")
+    parser.add_argument("--timeout", type=float, default=REQUEST_TIMEOUT[1],
+                        help="Read timeout of each request in seconds")
+    parser.add_argument("--report", default="dgraph_rename_report.csv")
+    args = parser.parse_args()
+
+    tag_changes = read_tag_changes(args.csv_path, args.old_col_name, args.new_col_name, args.separator)
+    renamer = DgraphTagRenamer(args.graphql_endpoint, args.scope, batch_size=args.batch_size,
+                               concurrency=args.concurrency, rollback_file=args.rollback_file,
+                               timeout=(REQUEST_TIMEOUT[0], args.timeout))
+    stats, failures = renamer.rename(tag_changes)
+    print(f"Renamed {len(tag_changes)} tags: {stats}")
+    print(f"Rollback file saved to '{args.rollback_file}'")
+    if failures:
+        with open(args.report, 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(['OldTagName', 'NewTagName', 'status'])
+            writer.writerows(failures)
+        print(f"{len(failures)} tags not renamed exactly once, see '{args.report}'")
+
+
+if __name__ == "__main__":
+    main()
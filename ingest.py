@@ -0,0 +1,82 @@
+import hashlib
+import os
+import time
+
+import pandas as pd
+
+CACHE_DIR = "./.cache/ingest"
+# bump when the way sources are parsed changes, so older cache files are not picked up
+CACHE_VERSION = 1
+
+try:
+    import pyarrow  # noqa: F401
+    CACHE_FORMAT = "parquet"
+except ImportError:
+    try:
+        import fastparquet  # noqa: F401
+        CACHE_FORMAT = "parquet"
+    except ImportError:
+        CACHE_FORMAT = "pickle"
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """blake2b digest of the file content, so a renamed or touched but unchanged source hits the cache."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _cache_path(path, columns, dtype, sheet_name, separator):
+    key = hashlib.blake2b(digest_size=8)
+    key.update(repr((CACHE_VERSION, file_digest(path), columns, dtype, sheet_name, separator)).encode('utf-8'))
+    stem = os.path.splitext(os.path.basename(path))[0].replace(" ", "_")
+    extension = "parquet" if CACHE_FORMAT == "parquet" else "pkl"
+    return os.path.join(CACHE_DIR, f"{stem}-{key.hexdigest()}.{extension}")
+
+
+def read_source(path, columns=None, dtype=str, sheet_name=0, separator=",", use_cache=True):
+    """
+    Read a raw rename source (xlsx or csv) once and serve later reads from a columnar cache.
+
+    Only the needed columns are parsed, with explicit dtypes (all names, tep ids and timestamps are kept as
+    strings by default, so tag names are never turned into numbers or dates). The result is cached under
+    CACHE_DIR as Parquet (pickle when no Parquet engine is installed), keyed by the content hash of the source
+    and the read options, so a changed source is re-read and an unchanged one loads from the cache.
+
+    Parameters:
+    - path (str): .xlsx/.xls or delimited text file.
+    - columns (list of str): Columns to keep, all columns when None.
+    - dtype: dtype or {column: dtype} passed to pandas.
+    - sheet_name: Excel sheet, ignored for text files.
+
+    Returns:
+    - pd.DataFrame: The source columns.
+    """
+    is_excel = os.path.splitext(path)[1].lower() in (".xlsx", ".xlsm", ".xls")
+    cache_path = _cache_path(path, columns, dtype, sheet_name if is_excel else None, separator) if use_cache else None
+    if cache_path and os.path.exists(cache_path):
+        start = time.perf_counter()
+        df = pd.read_parquet(cache_path) if CACHE_FORMAT == "parquet" else pd.read_pickle(cache_path)
+        print(f"Loaded '{path}' from cache '{cache_path}' in {(time.perf_counter() - start) * 1000:.1f} ms")
+        return df
+
+    start = time.perf_counter()
+    if is_excel:
+        df = pd.read_excel(path, sheet_name=sheet_name, usecols=columns, dtype=dtype)
+    else:
+        df = pd.read_csv(path, sep=separator, usecols=columns, dtype=dtype)
+    if columns is not None:
+        df = df[columns]
+    print(f"Parsed '{path}' in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    if cache_path:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_path = f"{cache_path}.tmp"
+        if CACHE_FORMAT == "parquet":
+            df.to_parquet(tmp_path, index=False)
+        else:
+            df.to_pickle(tmp_path)
+        os.replace(tmp_path, cache_path)
+    return df
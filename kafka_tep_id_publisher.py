@@ -0,0 +1,184 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+
+DEFAULT_KAFKA_CONFIG_FILE = "/app/config/tep-sdpcli-kafka-config.json"
+
+
+def load_producer_config(config_file=DEFAULT_KAFKA_CONFIG_FILE, section="producer"):
+    """Read the librdkafka producer settings of tep-sdpcli-kafka-config.json (acks, linger.ms, compression...)."""
+    with open(config_file) as file:
+        return dict(json.load(file)[section])
+
+
+def read_tep_id_changes(csv_path, old_col_name='old tep_id', new_col_name='new tep_id', time_col_name=None):
+    """Read the resolved old -> new tep_id pairs, rows without both tep ids are skipped."""
+    columns = [old_col_name, new_col_name] + ([time_col_name] if time_col_name else [])
+    df = pd.read_csv(csv_path, usecols=columns, dtype=str).dropna(subset=[old_col_name, new_col_name])
+    df = df.rename(columns={old_col_name: 'oldTepId', new_col_name: 'newTepId', time_col_name: 'createdTimeNewTag'})
+    return df.to_dict(orient='records')
+
+
+def json_serializer(topic, change):
+    """Plain JSON value, only for topics whose consumers do not expect schema registry framed messages."""
+    return json.dumps(change, separators=(',', ':')).encode('utf-8')
+
+
+def schema_registry_serializer(schema_registry_url, subject):
+    """
+    Serializer of the latest schema of the subject (the one the sdp-cli step writes the topic with), Avro or
+    JSON schema, producing schema registry framed values.
+    """
+    from confluent_kafka.schema_registry import SchemaRegistryClient
+    from confluent_kafka.serialization import MessageField, SerializationContext
+
+    client = SchemaRegistryClient({'url': schema_registry_url})
+    schema = client.get_latest_version(subject).schema
+    if schema.schema_type == "AVRO":
+        from confluent_kafka.schema_registry.avro import AvroSerializer
+        serializer = AvroSerializer(client, schema.schema_str, conf={'auto.register.schemas': False})
+    elif schema.schema_type == "JSON":
+        from confluent_kafka.schema_registry.json_schema import JSONSerializer
+        serializer = JSONSerializer(schema.schema_str, client, conf={'auto.register.schemas': False})
+    else:
+        raise ValueError(f"Unsupported schema type {schema.schema_type} for subject '{subject}'")
+    return lambda topic, change: serializer(change, SerializationContext(topic, MessageField.VALUE))
+
+
+class DeliveryTracker:
+    """Delivery report callback counting delivered and failed messages, failed keys are kept for a retry file."""
+
+    def __init__(self):
+        self.delivered = 0
+        self.failed = 0
+        self.failed_keys = []
+        self.delivered_bytes = 0
+
+    def __call__(self, err, msg):
+        if err is not None:
+            self.failed += 1
+            self.failed_keys.append(msg.key().decode('utf-8') if msg.key() else None)
+        else:
+            self.delivered += 1
+            self.delivered_bytes += len(msg.value() or b'')
+
+
+def publish_tep_id_changes(producer, topic, changes, poll_every=1000, serializer=json_serializer):
+    """
+    Publish the tep id changes keyed by the old tep_id, serialized by serializer(topic, change) (plain JSON
+    by default).
+
+    The producer batches and compresses according to its configuration (linger.ms, batch.num.messages,
+    compression.type), produce() is only interrupted to serve delivery reports every poll_every messages
+    or when the local queue is full.
+
+    Parameters:
+    - producer: confluent_kafka.Producer, or any object with the same produce/poll/flush interface.
+    - topic (str): Kafka topic.
+    - changes (list of dicts): Messages, e.g. {'oldTepId': ..., 'newTepId': ..., 'createdTimeNewTag': ...}.
+    - serializer (callable): (topic, change) -> bytes, see schema_registry_serializer.
+
+    Returns:
+    - DeliveryTracker: Delivery counts and failed keys.
+    - float: Seconds from the first produce to the end of the flush.
+    """
+    tracker = DeliveryTracker()
+    start = time.perf_counter()
+    for i, change in enumerate(changes, start=1):
+        key = change['oldTepId'].encode('utf-8')
+        value = serializer(topic, change)
+        while True:
+            try:
+                producer.produce(topic, key=key, value=value, on_delivery=tracker)
+                break
+            except BufferError:
+                # local queue full (queue.buffering.max.messages), wait for deliveries to drain it
+                producer.poll(0.5)
+        if i % poll_every == 0:
+            producer.poll(0)
+
+    remaining = producer.flush()
+    elapsed = time.perf_counter() - start
+    if remaining:
+        print(f"{remaining} messages still queued after flush")
+    return tracker, elapsed
+
+
+def store_failed_changes(changes, failed_keys, output_file, old_col_name, new_col_name, time_col_name=None):
+    """Write the full rows of the failed messages with the input column names, so the file can be replayed."""
+    failed = set(failed_keys)
+    df = pd.DataFrame([change for change in changes if change['oldTepId'] in failed])
+    df = df.rename(columns={'oldTepId': old_col_name, 'newTepId': new_col_name, 'createdTimeNewTag': time_col_name})
+    df.to_csv(output_file, index=False)
+    print(f"{len(df)} failed tep id changes saved to '{output_file}'")
+
+
+def build_producer_config(args):
+    """Producer settings of the config file plus connection and security settings, failing on missing ones."""
+    if not args.bootstrap_servers:
+        sys.exit("No Kafka bootstrap servers, set --bootstrap-servers or KAFKA_BOOTSTRAP_SERVERS")
+    config = load_producer_config(args.config_file)
+    config['bootstrap.servers'] = args.bootstrap_servers
+    config['security.protocol'] = args.security_protocol
+    for key, value in (('ssl.ca.location', args.ssl_ca_location),
+                       ('ssl.certificate.location', args.ssl_certificate_location),
+                       ('ssl.key.location', args.ssl_key_location)):
+        if value:
+            config[key] = value
+    for setting in args.config:
+        key, _, value = setting.partition('=')
+        config[key] = value
+    return config
+
+
+def main():
+    from confluent_kafka import Producer
+
+    parser = argparse.ArgumentParser(description="Publish resolved old -> new tep_id changes to Kafka.")
+    parser.add_argument("--csv-path", required=True)
+    parser.add_argument("--old-col-name", default="old tep_id")
+    parser.add_argument("--new-col-name", default="new tep_id")
+    parser.add_argument("--time-col-name", default=None)
+    parser.add_argument("--config-file", default=os.environ.get("APP_CONFIG_FILE_PATH", DEFAULT_KAFKA_CONFIG_FILE))
+    parser.add_argument("--topic", required=True)
+    parser.add_argument("--schema-registry-url", default=None,
+                        help="Serialize with the latest schema of --schema-subject instead of plain JSON")
+    parser.add_argument("--schema-subject", default=None)
+    parser.add_argument("--bootstrap-servers", default=os.environ.get("KAFKA_BOOTSTRAP_SERVERS"))
+    parser.add_argument("--security-protocol", default=os.environ.get("KAFKA_SECURITY_PROTOCOL", "SSL"))
+    parser.add_argument("--ssl-ca-location", default=os.environ.get("KAFKA_SSL_CA_LOCATION"))
+    parser.add_argument("--ssl-certificate-location", default=os.environ.get("KAFKA_SSL_CERTIFICATE_LOCATION"))
+    parser.add_argument("--ssl-key-location", default=os.environ.get("KAFKA_SSL_KEY_LOCATION"))
+    parser.add_argument("-X", "--config", action="append", default=[], metavar="KEY=VALUE",
+                        help="Extra librdkafka producer setting, can be repeated")
+    parser.add_argument("--failed-file", default="kafka_failed_tep_id_changes.csv")
+    args = parser.parse_args()
+
+    if args.schema_registry_url:
+        if not args.schema_subject:
+            sys.exit("--schema-subject is required with --schema-registry-url")
+        serializer = schema_registry_serializer(args.schema_registry_url, args.schema_subject)
+    elif args.topic == os.environ.get("APP__KAFKA__TOPIC"):
+        sys.exit(f"Topic '{args.topic}' is written with schema registry encoding by the sdp-cli step, "
+                 f"pass --schema-registry-url and --schema-subject")
+    else:
+        serializer = json_serializer
+
+    config = build_producer_config(args)
+    changes = read_tep_id_changes(args.csv_path, args.old_col_name, args.new_col_name, args.time_col_name)
+
+    tracker, elapsed = publish_tep_id_changes(Producer(config), args.topic, changes, serializer=serializer)
+    print(f"Published {len(changes)} tep id changes to '{args.topic}' in {elapsed:.2f}s "
+          f"({len(changes) / elapsed:.0f} msg/s): {tracker.delivered} delivered, {tracker.failed} failed")
+    if tracker.failed_keys:
+        store_failed_changes(changes, tracker.failed_keys, args.failed_file, args.old_col_name, args.new_col_name,
+                             args.time_col_name)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
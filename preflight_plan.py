@@ -0,0 +1,206 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from collections import Counter
+
+import pandas as pd
+
+from redis_tag_updater import DEFAULT_HASH_NAME, get_redis_client, read_tag_changes, tag_change_levels
+from scada_signal_snapshot import add_snapshot_arguments, export_snapshot
+from utils import fetch_and_update_tepid
+
+PLAN_VERSION = 1
+# issues that make the apply step wrong (or ambiguous), a plan with any of them is not frozen
+BLOCKING_ISSUES = ('duplicate_old', 'duplicate_new', 'cycles', 'conflicts_in_redis')
+
+
+def check_duplicates(tag_changes):
+    """Old tags renamed to several new tags, and new tags targeted by several old tags."""
+    old_counts = Counter(old for old, _ in set(tag_changes))
+    new_counts = Counter(new for _, new in set(tag_changes))
+    return {
+        'duplicate_old': sorted(tag for tag, count in old_counts.items() if count > 1),
+        'duplicate_new': sorted(tag for tag, count in new_counts.items() if count > 1),
+    }
+
+
+def order_tag_changes(tag_changes):
+    """Flattened tag_change_levels: ordered renames, chained renames and renames that could not be ordered."""
+    levels, chained, cycles = tag_change_levels(tag_changes)
+    return [change for level in levels for change in level], chained, cycles
+
+
+def diff_redis_keys(client, tag_changes, hash_name=DEFAULT_HASH_NAME, batch_size=1000):
+    """
+    Read the current values of the old and new tags with pipelined HMGET (read-only).
+
+    Returns:
+    - list of tuples: (old, new, old tep_id, new tep_id) in the order of tag_changes.
+    - float: Average seconds per pipelined round trip, used to size the apply batches.
+    """
+    diffs = []
+    round_trips = 0
+    start = time.perf_counter()
+    for i in range(0, len(tag_changes), batch_size):
+        batch = tag_changes[i:i + batch_size]
+        pipe = client.pipeline(transaction=False)
+        pipe.hmget(hash_name, [old for old, _ in batch])
+        pipe.hmget(hash_name, [new for _, new in batch])
+        old_values, new_values = pipe.execute()
+        round_trips += 1
+        diffs.extend((old, new, old_value, new_value)
+                     for (old, new), old_value, new_value in zip(batch, old_values, new_values))
+    seconds_per_round_trip = (time.perf_counter() - start) / round_trips if round_trips else 0.0
+    return diffs, seconds_per_round_trip
+
+
+def size_batches(n_ops, seconds_per_round_trip, read_batch_size, target_batch_seconds=0.05,
+                 min_batch_size=100, max_batch_size=10000):
+    """Pick the apply batch size so that each pipeline takes about target_batch_seconds."""
+    if seconds_per_round_trip <= 0:
+        return max_batch_size
+    seconds_per_op = seconds_per_round_trip / max(read_batch_size, 1)
+    batch_size = int(target_batch_seconds / seconds_per_op) if seconds_per_op else max_batch_size
+    return max(min_batch_size, min(max_batch_size, batch_size, max(n_ops, min_batch_size)))
+
+
+def build_plan(tag_changes, resolved_df, diffs, seconds_per_round_trip, read_batch_size, hash_name):
+    """Freeze the Redis operations of the apply step and the expected downtime into a plan dict."""
+    issues = check_duplicates(tag_changes)
+    ordered, chained, cycles = order_tag_changes(tag_changes)
+    issues['chained'] = [list(change) for change in chained]
+    issues['cycles'] = [list(change) for change in cycles]
+
+    values = {(old, new): (old_value, new_value) for old, new, old_value, new_value in diffs}
+    chained_set = set(chained)
+    ops, already_applied, missing, conflicts = [], [], [], []
+    for old, new in ordered:
+        old_value, new_value = values[(old, new)]
+        if old_value is None:
+            (already_applied if new_value is not None else missing).append([old, new])
+        elif new_value == old_value:
+            already_applied.append([old, new])
+        elif new_value is not None and (old, new) not in chained_set:
+            # a chained new tag exists in Redis as the old tag of another rename and is overwritten by design
+            conflicts.append([old, new, old_value, new_value])
+        else:
+            ops.append([old, new, old_value])
+    issues['missing_in_redis'] = missing
+    issues['conflicts_in_redis'] = conflicts
+
+    if resolved_df is not None:
+        issues['unresolved_old_in_dgraph'] = resolved_df.loc[resolved_df['old tep_id'].isna(), 'old'].tolist()
+        issues['unresolved_new_in_dgraph'] = resolved_df.loc[resolved_df['new tep_id'].isna(), 'new'].tolist()
+
+    batch_size = size_batches(len(ops), seconds_per_round_trip, read_batch_size)
+    n_batches = -(-len(ops) // batch_size) if ops else 0
+    # the apply step writes every batch in a single pipelined round trip of HSET, at least as fast as the diff
+    expected_apply_seconds = max(n_batches, len(ops) / read_batch_size) * seconds_per_round_trip
+
+    ops_digest = hashlib.sha256(json.dumps(ops, separators=(',', ':')).encode('utf-8')).hexdigest()
+    return {
+        'version': PLAN_VERSION,
+        'created_at': time.time(),
+        'hash_name': hash_name,
+        'batch_size': batch_size,
+        'ops_sha256': ops_digest,
+        'ops': ops,
+        'already_applied': already_applied,
+        'issues': issues,
+        'estimate': {
+            'ops': len(ops),
+            'batches': n_batches,
+            'seconds_per_round_trip': seconds_per_round_trip,
+            'expected_apply_seconds': expected_apply_seconds,
+        },
+    }
+
+
+def blocking_issues(plan):
+    """Blocking issues of a plan with their count, empty when the plan can be applied."""
+    return {name: len(plan['issues'].get(name, [])) for name in BLOCKING_ISSUES if plan['issues'].get(name)}
+
+
+def store_plan(plan, output_file):
+    with open(output_file, 'w') as file:
+        json.dump(plan, file)
+    print(f"Plan with {len(plan['ops'])} operations saved to '{output_file}'")
+
+
+def load_plan(plan_file, max_age_seconds=None):
+    """Load a frozen plan, checking its checksum and, when given, that it is not older than max_age_seconds."""
+    with open(plan_file) as file:
+        plan = json.load(file)
+    if plan.get('version') != PLAN_VERSION:
+        raise ValueError(f"Unsupported plan version {plan.get('version')}")
+    ops_digest = hashlib.sha256(json.dumps(plan['ops'], separators=(',', ':')).encode('utf-8')).hexdigest()
+    if ops_digest != plan['ops_sha256']:
+        raise ValueError("Plan checksum mismatch, the operations were modified after planning")
+    age = time.time() - plan['created_at']
+    if max_age_seconds is not None and age > max_age_seconds:
+        raise ValueError(f"Plan is {age:.0f}s old (max {max_age_seconds}s), run the pre-flight again")
+    if blocking_issues(plan):
+        raise ValueError(f"Plan has blocking issues {blocking_issues(plan)}, fix the change file first")
+    return plan
+
+
+def print_plan_summary(plan):
+    issues = plan['issues']
+    print("Pre-flight summary:")
+    for name, values in issues.items():
+        print(f"  {name}: {len(values)}")
+    print(f"  already applied: {len(plan['already_applied'])}")
+    estimate = plan['estimate']
+    print(f"  operations: {estimate['ops']} in {estimate['batches']} batches of {plan['batch_size']}")
+    print(f"  expected downtime for the apply step: {estimate['expected_apply_seconds']:.2f}s "
+          f"({estimate['seconds_per_round_trip'] * 1000:.1f} ms per round trip)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resolve, validate and diff a tag change file before the "
+                                                 "consumers are scaled down, and freeze the Redis apply plan.")
+    parser.add_argument("--csv-path", required=True)
+    parser.add_argument("--old-col-name", default="OldTagName")
+    parser.add_argument("--new-col-name", default="NewTagName")
+    parser.add_argument("--separator", default=",")
+    parser.add_argument("--hash-name", default=os.environ.get("APP__REDIS__HASH_NAME", DEFAULT_HASH_NAME))
+    parser.add_argument("--read-batch-size", type=int, default=1000)
+    parser.add_argument("--graphql-endpoint")
+    parser.add_argument("--scope")
+    parser.add_argument("--plan", default="planned-tag-update-plan.json")
+    add_snapshot_arguments(parser)
+    args = parser.parse_args()
+
+    tag_changes = read_tag_changes(args.csv_path, args.old_col_name, args.new_col_name, args.separator)
+    print(f"Pre-flight for {len(tag_changes)} tag renames")
+
+    resolved_df = None
+    if args.graphql_endpoint:
+        if args.refresh_snapshot and args.tag_lookup != "per_tag":
+            export_snapshot(args.graphql_endpoint, args.scope)
+        df = pd.DataFrame(tag_changes, columns=['old', 'new'])
+        resolved_df = fetch_and_update_tepid(args.graphql_endpoint, args.scope, df,
+                                             [('old', 'old tep_id'), ('new', 'new tep_id')], mode=args.tag_lookup)
+        resolved_df.to_csv(f"{os.path.splitext(args.plan)[0]}_resolved.csv", index=False)
+
+    diffs, seconds_per_round_trip = diff_redis_keys(get_redis_client(), tag_changes, args.hash_name,
+                                                    args.read_batch_size)
+    plan = build_plan(tag_changes, resolved_df, diffs, seconds_per_round_trip, args.read_batch_size,
+                      args.hash_name)
+    print_plan_summary(plan)
+
+    blocking = blocking_issues(plan)
+    if blocking:
+        issues_file = f"{os.path.splitext(args.plan)[0]}_issues.json"
+        with open(issues_file, 'w') as file:
+            json.dump(plan['issues'], file, indent=2)
+        print(f"Plan not frozen, blocking issues {blocking}, see '{issues_file}'")
+        sys.exit(1)
+    store_plan(plan, args.plan)
+
+
+if __name__ == "__main__":
+    main()
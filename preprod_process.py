@@ -1,13 +1,25 @@
-import pandas as pd
+import argparse
+
+from ingest import read_source
+from profiling import StageProfiler, add_profile_argument
+from scada_signal_snapshot import add_snapshot_arguments, export_snapshot, get_signal_snapshot
+from tag_name_matcher import write_suggestions
 from utils import count_datetime_occurrences, fetch_timestamps, fetch_and_update_tepid
 
 # GraphQL endpoint and query template
 graphql_endpoint = "https://doggerbankpreprod.dev.aurora.equinor.com/storm/meta"
 scope_dev_preprod = "api://8884d831-f8ef-41f3-b4d5-2d655d93b867"
 
+parser = argparse.ArgumentParser(description="Resolve timestamps and tep ids of the renamed tags.")
+args = add_snapshot_arguments(add_profile_argument(parser)).parse_args()
+profiler = StageProfiler("./preprod", args.profile)
+
+if args.refresh_snapshot and args.tag_lookup != "per_tag":
+    export_snapshot(graphql_endpoint, scope_dev_preprod)
 
 csv_file = "./RAW-data/tag_name_changes_final.csv"
-df = pd.read_csv(csv_file)
+with profiler.stage('csv_io'):
+    df = read_source(csv_file, columns=['Dgraph Name', 'New Name'])
 
 # Call the function to fetch timestamps and update tep ids based on multiple columns
 column_mappings_time = [
@@ -18,17 +30,27 @@ column_mappings = [
     ('Dgraph Name', 'old tep_id'),
     ('New Name', 'new tep_id')       # Source column and new column
 ]
+# Load the snapshot once for the timestamps and the tep ids, None for per tag queries
+with profiler.stage('load_snapshot'):
+    snapshot = get_signal_snapshot(graphql_endpoint, scope_dev_preprod,
+                                   [tag for source_column, _ in column_mappings for tag in df[source_column]],
+                                   args.tag_lookup)
+tag_lookup = args.tag_lookup if snapshot is not None else "per_tag"
+
 # Fetch timestamps for each column and collect results
 timestamp_info = {}
 for source_column, new_column in column_mappings_time:
-    df_time, start_time, end_time, fetched_timestamps = fetch_timestamps(graphql_endpoint, scope_dev_preprod, df, source_column)
+    with profiler.stage('fetch_timestamps'):
+        df_time, start_time, end_time, fetched_timestamps = fetch_timestamps(graphql_endpoint, scope_dev_preprod, df, source_column,
+                                                                             mode=tag_lookup, snapshot=snapshot)
     timestamp_info[new_column] = {
         'start_time': start_time,
         'end_time': end_time,
         'fetched_timestamps': fetched_timestamps,
         'count': len(fetched_timestamps)
     }
-df_time.to_csv("./preprod/time_of_newTag_cleaned_final.csv", index=False)
+with profiler.stage('csv_io'):
+    df_time.to_csv("./preprod/time_of_newTag_cleaned_final.csv", index=False)
 
 # Output results for each column
 for new_column, info in timestamp_info.items():
@@ -38,10 +60,20 @@ for new_column, info in timestamp_info.items():
     print(f"All timestamps fetched: {info['fetched_timestamps']}, with number of {info['count']}")
 
 # Update DataFrame with tep ids
-updated_df = fetch_and_update_tepid(graphql_endpoint, scope_dev_preprod, df, column_mappings)
+with profiler.stage('fetch_and_update_tepid'):
+    updated_df = fetch_and_update_tepid(graphql_endpoint, scope_dev_preprod, df, column_mappings,
+                                        mode=tag_lookup, snapshot=snapshot)
 
 # Save the updated DataFrame to a new CSV file
-updated_df.to_csv("./preprod/tagname_tepid_final.csv", index=False)
+with profiler.stage('csv_io'):
+    updated_df.to_csv("./preprod/tagname_tepid_final.csv", index=False)
+
+# Suggest known signal names for the tags without a tep id
+with profiler.stage('suggest_names'):
+    write_suggestions(updated_df, graphql_endpoint, scope_dev_preprod, column_mappings,
+                      "./preprod/tagname_tepid_final_suggestions.csv")
 
 unique_time = count_datetime_occurrences(fetched_timestamps)
-print(f"unique timestamp: {unique_time}")
\ No newline at end of file
+print(f"unique timestamp: {unique_time}")
+
+profiler.write_reports()
@@ -1,12 +1,25 @@
-import pandas as pd
+import argparse
+
+from ingest import read_source
+from profiling import StageProfiler, add_profile_argument
+from scada_signal_snapshot import add_snapshot_arguments, export_snapshot, get_signal_snapshot
+from tag_name_matcher import write_suggestions
 from utils import count_datetime_occurrences, fetch_timestamps, fetch_and_update_tepid, fetch_metadata_and_update, store_timestamp_info_to_file
 
 # GraphQL endpoint and query template
 graphql_endpoint = "https://doggerbankprod.aurora.equinor.com/storm/meta"
 scope_prod = "api://c8fd6e51-6dd5-415b-8d43-3bedb52aa75e"
 
+parser = argparse.ArgumentParser(description="Resolve timestamps and tep ids of the renamed tags.")
+args = add_snapshot_arguments(add_profile_argument(parser)).parse_args()
+profiler = StageProfiler("./prod/right", args.profile)
+
+if args.refresh_snapshot and args.tag_lookup != "per_tag":
+    export_snapshot(graphql_endpoint, scope_prod)
+
 csv_file = "./RAW-data/tag_name_changes2Cleaned.csv"
-df = pd.read_csv(csv_file)
+with profiler.stage('csv_io'):
+    df = read_source(csv_file, columns=['Dgraph Name', 'New Name'])
 
 # Call the function to fetch timestamps and update tep ids based on multiple columns
 column_mappings_time = [
@@ -17,17 +30,27 @@ column_mappings = [
     ('New Name', 'new tep_id')      
 ]
 
+# Load the snapshot once for the timestamps and the tep ids, None for per tag queries
+with profiler.stage('load_snapshot'):
+    snapshot = get_signal_snapshot(graphql_endpoint, scope_prod,
+                                   [tag for source_column, _ in column_mappings for tag in df[source_column]],
+                                   args.tag_lookup)
+tag_lookup = args.tag_lookup if snapshot is not None else "per_tag"
+
 # Fetch timestamps for each column and collect results
 timestamp_info = {}
 for source_column, new_column in column_mappings_time:
-    df_time, start_time, end_time, fetched_timestamps = fetch_timestamps(graphql_endpoint, scope_prod, df, source_column)
+    with profiler.stage('fetch_timestamps'):
+        df_time, start_time, end_time, fetched_timestamps = fetch_timestamps(graphql_endpoint, scope_prod, df, source_column,
+                                                                             mode=tag_lookup, snapshot=snapshot)
     timestamp_info[new_column] = {
         'start_time': start_time,
         'end_time': end_time,
         'fetched_timestamps': fetched_timestamps,
         'count': len(fetched_timestamps)
     }
-df_time.to_csv("./prod/right/time_of_newTag_cleaned_final.csv", index=False)
+with profiler.stage('csv_io'):
+    df_time.to_csv("./prod/right/time_of_newTag_cleaned_final.csv", index=False)
 
 for new_column, info in timestamp_info.items():
     print(f"Results for column '{new_column}':")
@@ -38,8 +61,16 @@ for new_column, info in timestamp_info.items():
 store_timestamp_info_to_file(timestamp_info, './prod/right/timestamp_info_final_file.txt')
 
 # Update DataFrame with tep ids
-updated_df = fetch_and_update_tepid(graphql_endpoint, scope_prod, df, column_mappings)
-updated_df.to_csv("./prod/right/tagname_tepid_final.csv", index=False)
+with profiler.stage('fetch_and_update_tepid'):
+    updated_df = fetch_and_update_tepid(graphql_endpoint, scope_prod, df, column_mappings,
+                                        mode=tag_lookup, snapshot=snapshot)
+with profiler.stage('csv_io'):
+    updated_df.to_csv("./prod/right/tagname_tepid_final.csv", index=False)
+
+# Suggest known signal names for the tags without a tep id
+with profiler.stage('suggest_names'):
+    write_suggestions(updated_df, graphql_endpoint, scope_prod, column_mappings,
+                      "./prod/right/tagname_tepid_final_suggestions.csv")
 
 
 # updated_df, timestamp_info, fetched_timestamps = fetch_metadata_and_update(df, graphql_endpoint, scope_prod, column_mappings, timestamp_column='New Name')
@@ -59,3 +90,4 @@ with open('./prod/right/timestamp_occurrences.txt', 'w') as file:
     for timestamp, count in unique_time.items():
         file.write(f"{timestamp}: {count}\n")
 
+profiler.write_reports()
@@ -0,0 +1,118 @@
+import cProfile
+import io
+import os
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+PROFILERS = ('cprofile', 'pyinstrument')
+
+
+def add_profile_argument(parser):
+    """Add the opt-in --profile [cprofile|pyinstrument] switch to an entry point's argument parser."""
+    parser.add_argument("--profile", nargs="?", const="cprofile", default=None, choices=PROFILERS,
+                        help="Record CPU stats and tracemalloc peaks per stage next to the outputs")
+    return parser
+
+
+class StageProfiler:
+    """
+    Opt-in CPU and memory profiling of the stages of a resolution run.
+
+    Each `with profiler.stage(name):` block is profiled with cProfile (or pyinstrument when installed and
+    requested) and tracemalloc. A stage entered several times (e.g. csv_io) is accumulated into one report.
+    On write_reports the per stage stats are saved as <prefix>_<stage>.pstats/.txt (or .html for pyinstrument)
+    in output_dir, and one line per stage is appended to <prefix>_summary.txt so runs can be compared over time.
+    When disabled, stage() is a no-op.
+    """
+
+    def __init__(self, output_dir, profiler=None, prefix="profile"):
+        self.output_dir = output_dir
+        self.profiler = profiler
+        self.prefix = prefix
+        self.enabled = profiler is not None
+        self._stages = {}
+        self._started_tracemalloc = False
+
+        if profiler == 'pyinstrument':
+            try:
+                import pyinstrument  # noqa: F401
+            except ImportError:
+                print("pyinstrument is not installed, falling back to cProfile")
+                self.profiler = 'cprofile'
+
+    def _stage_record(self, name):
+        if name not in self._stages:
+            if self.profiler == 'pyinstrument':
+                from pyinstrument import Profiler
+                cpu_profiler = Profiler()
+            else:
+                cpu_profiler = cProfile.Profile()
+            self._stages[name] = {'profiler': cpu_profiler, 'calls': 0, 'seconds': 0.0, 'peak_bytes': 0}
+        return self._stages[name]
+
+    @contextmanager
+    def stage(self, name):
+        if not self.enabled:
+            yield
+            return
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        tracemalloc.reset_peak()
+        record = self._stage_record(name)
+        cpu_profiler = record['profiler']
+
+        if self.profiler == 'pyinstrument':
+            cpu_profiler.start()
+        else:
+            cpu_profiler.enable()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            if self.profiler == 'pyinstrument':
+                cpu_profiler.stop()
+            else:
+                cpu_profiler.disable()
+            _, peak = tracemalloc.get_traced_memory()
+            record['calls'] += 1
+            record['seconds'] += elapsed
+            record['peak_bytes'] = max(record['peak_bytes'], peak)
+            print(f"[profile] {name}: {elapsed:.2f}s, peak memory {peak / 2 ** 20:.1f} MiB")
+
+    def write_reports(self, top=40):
+        """Write the per stage reports and append this run to the summary file."""
+        if not self.enabled or not self._stages:
+            return
+        os.makedirs(self.output_dir, exist_ok=True)
+        run_time = datetime.now().isoformat(timespec='seconds')
+
+        for name, record in self._stages.items():
+            base = os.path.join(self.output_dir, f"{self.prefix}_{name}")
+            if self.profiler == 'pyinstrument':
+                with open(f"{base}.html", 'w') as file:
+                    file.write(record['profiler'].output_html())
+                continue
+            record['profiler'].dump_stats(f"{base}.pstats")
+            stream = io.StringIO()
+            stats = pstats.Stats(record['profiler'], stream=stream)
+            stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top)
+            stats.sort_stats(pstats.SortKey.TIME).print_stats(top)
+            with open(f"{base}.txt", 'w') as file:
+                file.write(stream.getvalue())
+
+        summary_file = os.path.join(self.output_dir, f"{self.prefix}_summary.txt")
+        with open(summary_file, 'a') as file:
+            for name, record in self._stages.items():
+                file.write(f"{run_time}\t{name}\tcalls={record['calls']}\tseconds={record['seconds']:.3f}\t"
+                           f"peak_mib={record['peak_bytes'] / 2 ** 20:.1f}\n")
+        print(f"Profile reports saved to '{self.output_dir}', summary appended to '{summary_file}'")
+
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
@@ -0,0 +1,314 @@
+import argparse
+import os
+import time
+from collections import Counter
+
+import pandas as pd
+import redis
+
+DEFAULT_HASH_NAME = "SCADA_TEPID"
+
+
+def get_redis_client():
+    """Build the Redis client from the same environment as the sdp-cli redis task (tep-redis-db secret)."""
+    is_tls = os.environ.get("APP__REDIS__IS_TLS", "true").lower() == "true"
+    port = os.environ.get("REDIS_SSL_PORT" if is_tls else "REDIS_PORT", "6380" if is_tls else "6379")
+    return redis.Redis(
+        host=os.environ.get("REDIS_HOST_NAME", "localhost"),
+        port=int(port),
+        password=os.environ.get("REDIS_PASSWORD") or None,
+        ssl=is_tls,
+        decode_responses=True,
+        socket_timeout=30,
+    )
+
+
+def read_tag_changes(csv_path, old_col_name, new_col_name, separator=","):
+    """Read the (old tag, new tag) pairs of a change file, stripped, without empty or identical names."""
+    df = pd.read_csv(csv_path, sep=separator, usecols=[old_col_name, new_col_name], dtype=str)
+    df = df.dropna(subset=[old_col_name, new_col_name])
+    df[old_col_name] = df[old_col_name].str.strip()
+    df[new_col_name] = df[new_col_name].str.strip()
+    df = df[(df[old_col_name] != "") & (df[old_col_name] != df[new_col_name])]
+    return list(zip(df[old_col_name], df[new_col_name]))
+
+
+def tag_change_levels(tag_changes):
+    """
+    Group renames in levels that can run in any order (or concurrently), levels must run one after the other.
+
+    A tag must be read as an old tag before it is overwritten as a new tag: for chains A -> B, B -> C the
+    rename B -> C is in an earlier level than A -> B, otherwise C would get the tep_id of A. Renames in a
+    cycle (A -> B, B -> A), and those depending on one, cannot be ordered and are returned separately.
+
+    Returns:
+    - list of lists of tuples: Levels of (old, new) renames.
+    - list of tuples: Chained renames (whose new tag is the old tag of another rename).
+    - list of tuples: Renames that could not be ordered.
+    """
+    unique_changes = list(dict.fromkeys(tag_changes))
+    pending_old = Counter(old for old, _ in unique_changes)
+    chained = [(old, new) for old, new in unique_changes if new in pending_old]
+
+    levels = []
+    remaining = unique_changes
+    while remaining:
+        ready = [(old, new) for old, new in remaining if pending_old.get(new, 0) == 0]
+        if not ready:
+            break
+        ready_set = set(ready)
+        for old, _ in ready:
+            pending_old[old] -= 1
+        levels.append(ready)
+        remaining = [change for change in remaining if change not in ready_set]
+    return levels, chained, remaining
+
+
+def _apply_batch(client, hash_name, batch, overwrite, chained_new, stats, report, applied_old, blocked_old):
+    old_names = [old for old, _ in batch]
+    new_names = [new for _, new in batch]
+
+    read_pipe = client.pipeline(transaction=False)
+    read_pipe.hmget(hash_name, old_names)
+    read_pipe.hmget(hash_name, new_names)
+    old_values, new_values = read_pipe.execute()
+
+    write_pipe = client.pipeline(transaction=False)
+    batch_stats = {'renamed': 0, 'already_applied': 0, 'missing': 0, 'conflict': 0, 'chain_blocked': 0}
+    batch_report = []
+    batch_applied = []
+    batch_blocked = []
+    for (old_name, new_name), old_value, new_value in zip(batch, old_values, new_values):
+        # the new tag still holds the tep_id of a rename that was not applied, overwriting it would lose it
+        if new_name in blocked_old:
+            batch_stats['chain_blocked'] += 1
+            batch_report.append((old_name, new_name, 'chain_blocked', old_value, new_value))
+            batch_blocked.append(old_name)
+            continue
+
+        if old_value is None:
+            if new_value is not None:
+                batch_stats['already_applied'] += 1
+            else:
+                batch_stats['missing'] += 1
+                batch_report.append((old_name, new_name, 'missing', None, None))
+                batch_blocked.append(old_name)
+            continue
+
+        if new_value == old_value:
+            batch_stats['already_applied'] += 1
+            batch_applied.append(old_name)
+            continue
+
+        # the new tag of a chained rename is the old tag of a rename applied in an earlier level
+        if new_value is not None and not overwrite and new_name not in chained_new:
+            batch_stats['conflict'] += 1
+            batch_report.append((old_name, new_name, 'conflict', old_value, new_value))
+            batch_blocked.append(old_name)
+            continue
+
+        write_pipe.hset(hash_name, new_name, old_value)
+        batch_applied.append(old_name)
+        batch_stats['renamed'] += 1
+
+    if len(write_pipe):
+        write_pipe.execute()
+
+    # only account for the batch once it has been written, a retried batch is re-read from scratch
+    for key, value in batch_stats.items():
+        stats[key] += value
+    report.extend(batch_report)
+    applied_old.extend(batch_applied)
+    blocked_old.update(batch_blocked)
+
+
+def _delete_old_tags(client, hash_name, old_names, new_names, batch_size, max_retries, stats):
+    """
+    HDEL the old tags once all new tags are written, except tags that are also the new tag of a rename
+    (chains A -> B, B -> C must keep B with the tep_id of A).
+    """
+    to_delete = [name for name in dict.fromkeys(old_names) if name not in new_names]
+    for i in range(0, len(to_delete), batch_size):
+        batch = to_delete[i:i + batch_size]
+        attempts = 0
+        while True:
+            try:
+                client.hdel(hash_name, *batch)
+                break
+            except (redis.ConnectionError, redis.TimeoutError) as e:
+                attempts += 1
+                stats['retries'] += 1
+                if attempts >= max_retries:
+                    print(f"Deleting old tags starting at {i} failed after {attempts} attempts: {e}")
+                    raise
+                print(f"Deleting old tags starting at {i} failed on attempt {attempts}/{max_retries}: {e}")
+                time.sleep(min(2 ** attempts, 30))
+    stats['deleted_old'] = len(to_delete)
+
+
+def apply_tag_renames(client, tag_changes, hash_name=DEFAULT_HASH_NAME, batch_size=1000, delete_old=False,
+                      overwrite=False, max_retries=5):
+    """
+    Apply (old tag, new tag) renames to the Redis tag -> tep_id hash with pipelined, batched HMGET/HSET/HDEL.
+
+    Each batch reads the current values of the old and new tags in one round trip, then writes the new tags
+    with the tep_id of the old ones in a second round trip. Renames are idempotent: tags already carrying the
+    old tep_id are skipped, so a failed batch is simply retried (with backoff) and a whole run can be re-run.
+
+    New tags targeted by several old tags are not applied and reported as duplicate_new, whatever batches
+    they would have landed in. Chained renames (A -> B, B -> C) are applied level by level, B -> C before
+    A -> B, see tag_change_levels; renames in a cycle are not applied and reported as cycle. When a link of a
+    chain is not applied (missing, conflict, duplicate_new, cycle), the renames writing its old tag are not
+    applied either and reported as chain_blocked, so B keeps its tep_id when B -> C was refused. Re-running a
+    chain that was already applied is not a no-op, use a pre-flight plan (preflight_plan.py) for those.
+
+    Parameters:
+    - client (redis.Redis): Redis client.
+    - tag_changes (list of tuples): (old tag name, new tag name) pairs.
+    - hash_name (str): Name of the Redis hash, SCADA_TEPID by default.
+    - batch_size (int): Number of renames per pipeline.
+    - delete_old (bool): Delete the old tag fields once all new tags are written (never those that are also
+      a new tag). The workflow verification expects them to be kept.
+    - overwrite (bool): Overwrite new tags that already exist with a different tep_id.
+    - max_retries (int): Attempts per batch on connection errors and timeouts.
+
+    Returns:
+    - dict: Counts of renamed, already applied, missing, conflicting, duplicate, cyclic and chain blocked tags,
+      batches and elapsed seconds.
+    - list of tuples: (old tag, new tag, status, old tep_id, new tep_id) for every rename not applied.
+    """
+    stats = {'renamed': 0, 'already_applied': 0, 'missing': 0, 'conflict': 0, 'duplicate_new': 0, 'cycle': 0,
+             'chain_blocked': 0, 'batches': 0, 'retries': 0}
+    report = []
+    start = time.perf_counter()
+
+    unique_changes = list(dict.fromkeys(tag_changes))
+    new_counts = Counter(new for _, new in unique_changes)
+    # old tags of the renames not applied, their tep_id must stay in place
+    blocked_old = set()
+    for old_name, new_name in unique_changes:
+        if new_counts[new_name] > 1:
+            stats['duplicate_new'] += 1
+            report.append((old_name, new_name, 'duplicate_new', None, None))
+            blocked_old.add(old_name)
+    levels, chained, cycles = tag_change_levels([(old, new) for old, new in unique_changes if new_counts[new] == 1])
+    for old_name, new_name in cycles:
+        stats['cycle'] += 1
+        report.append((old_name, new_name, 'cycle', None, None))
+        blocked_old.add(old_name)
+    chained_new = {new for _, new in chained}
+
+    applied_old = []
+    batches = [level[i:i + batch_size] for level in levels for i in range(0, len(level), batch_size)]
+    for batch_number, batch in enumerate(batches):
+        attempts = 0
+        while True:
+            try:
+                _apply_batch(client, hash_name, batch, overwrite, chained_new, stats, report, applied_old,
+                             blocked_old)
+                break
+            except (redis.ConnectionError, redis.TimeoutError) as e:
+                attempts += 1
+                stats['retries'] += 1
+                if attempts >= max_retries:
+                    print(f"Batch {batch_number} failed after {attempts} attempts: {e}")
+                    raise
+                print(f"Batch {batch_number} failed on attempt {attempts}/{max_retries}: {e}, retrying")
+                time.sleep(min(2 ** attempts, 30))
+        stats['batches'] += 1
+
+    if delete_old:
+        _delete_old_tags(client, hash_name, applied_old, {new for _, new in unique_changes}, batch_size,
+                         max_retries, stats)
+
+    stats['elapsed_seconds'] = time.perf_counter() - start
+    return stats, report
+
+
+def apply_plan(client, plan, delete_old=False, max_retries=5):
+    """
+    Apply the frozen operations of a pre-flight plan (see preflight_plan.py).
+
+    The tep_ids were read and the renames ordered and validated before the consumers were scaled down, so each
+    batch is a single pipelined round trip of HSET new tag -> planned tep_id, which is idempotent and retried
+    as a whole on connection errors. With delete_old the old tags are deleted in a final pass once all new
+    tags are written, except those that are also a new tag of the plan (chains A -> B, B -> C keep B).
+
+    Returns:
+    - dict: Counts of renamed tags, deleted old tags, batches, retries and elapsed seconds.
+    """
+    hash_name, batch_size, ops = plan['hash_name'], plan['batch_size'], plan['ops']
+    stats = {'renamed': 0, 'batches': 0, 'retries': 0}
+    start = time.perf_counter()
+
+    for i in range(0, len(ops), batch_size):
+        batch = ops[i:i + batch_size]
+        attempts = 0
+        while True:
+            try:
+                client.hset(hash_name, mapping={new_name: tep_id for _, new_name, tep_id in batch})
+                break
+            except (redis.ConnectionError, redis.TimeoutError) as e:
+                attempts += 1
+                stats['retries'] += 1
+                if attempts >= max_retries:
+                    print(f"Plan batch starting at operation {i} failed after {attempts} attempts: {e}")
+                    raise
+                print(f"Plan batch starting at operation {i} failed on attempt {attempts}/{max_retries}: {e}")
+                time.sleep(min(2 ** attempts, 30))
+        stats['renamed'] += len(batch)
+        stats['batches'] += 1
+
+    if delete_old:
+        _delete_old_tags(client, hash_name, [old_name for old_name, _, _ in ops],
+                         {new_name for _, new_name, _ in ops}, batch_size, max_retries, stats)
+
+    stats['elapsed_seconds'] = time.perf_counter() - start
+    return stats
+
+
+def store_rename_report(report, output_file):
+    df = pd.DataFrame(report, columns=['OldTagName', 'NewTagName', 'status', 'old tep_id', 'new tep_id'])
+    df.to_csv(output_file, index=False)
+    print(f"Rename report with {len(df)} rows saved to '{output_file}'")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply a tag change file to the SCADA_TEPID Redis hash.")
+    parser.add_argument("--csv-path")
+    parser.add_argument("--plan", help="Apply a frozen pre-flight plan instead of a change file")
+    parser.add_argument("--max-plan-age", type=int, default=3600)
+    parser.add_argument("--old-col-name", default="OldTagName")
+    parser.add_argument("--new-col-name", default="NewTagName")
+    parser.add_argument("--separator", default=",")
+    parser.add_argument("--hash-name", default=os.environ.get("APP__REDIS__HASH_NAME", DEFAULT_HASH_NAME))
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--max-retries", type=int, default=5)
+    parser.add_argument("--delete-old", action="store_true")
+    parser.add_argument("--overwrite", action="store_true")
+    parser.add_argument("--report", default="redis_rename_report.csv")
+    args = parser.parse_args()
+
+    if args.plan:
+        from preflight_plan import load_plan
+
+        plan = load_plan(args.plan, max_age_seconds=args.max_plan_age)
+        print(f"Applying plan '{args.plan}': {len(plan['ops'])} operations in batches of {plan['batch_size']}")
+        stats = apply_plan(get_redis_client(), plan, delete_old=args.delete_old, max_retries=args.max_retries)
+        print(f"Done in {stats['elapsed_seconds']:.2f}s "
+              f"(expected {plan['estimate']['expected_apply_seconds']:.2f}s): {stats}")
+        return
+
+    tag_changes = read_tag_changes(args.csv_path, args.old_col_name, args.new_col_name, args.separator)
+    print(f"Applying {len(tag_changes)} tag renames to '{args.hash_name}' in batches of {args.batch_size}")
+
+    stats, report = apply_tag_renames(get_redis_client(), tag_changes, hash_name=args.hash_name,
+                                      batch_size=args.batch_size, delete_old=args.delete_old,
+                                      overwrite=args.overwrite, max_retries=args.max_retries)
+    print(f"Done in {stats['elapsed_seconds']:.2f}s: {stats}")
+    if report:
+        store_rename_report(report, args.report)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,9 @@
 from fastapi import APIRouter, Depends, status, HTTPException, Request, Query, Response
-from fastapi.responses import JSONResponse
-from fastapi.encoders import jsonable_encoder
 from fastapi_jwt_auth import AuthJWT
 
 from sqlalchemy.orm import Session
 
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 import pytz
 
@@ -16,13 +14,22 @@ from app.core.logger import logger
 from app.schemas.scada.scada_schemas import ScadaReferenceSignalSchema, ScadaAggReferenceSignalSchema
 from app.api.dependencies import get_db
 from app.core.config import settings, ScadaIntallationType, limiterSettings
-from app.crud.scada.scada_signals_historicalvalue_crud import get_scada_historical_agg_signals
 from app.clients.scada.kg_tepids_client import KgTepIdsGet
 from app.core.circuitbreaker import ScadaCircuitBreaker
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
 from app.clients.scada.utils.cache_scada_signals_helper import ScadaLocalCacheHelper
+from .utils.scada_cache_sync import ScadaCacheSyncCoordinator
+from .utils.scada_json_response import build_scada_json_response
+from .utils.scada_downsampling import ScadaDownsampleMethod, downsample_item_values
+from .utils.scada_tep_id_alias_index import TepIdAliasIndex
+from .utils.scada_phase_timing import ScadaPhaseTimer, count_protection_trips
+from .utils.scada_signal_names import get_tep_ids_by_sig_names
+from .utils.scada_historical_query_planner import get_scada_historical_agg_signals_partitioned
+from .utils.scada_ref_name_index import ScadaRefNameIndex, SyncKey
+from .utils.scada_service_identity import ScadaServiceIdentity, is_service_dependency, service_dependency
+from .utils.scada_settings import scada_setting
 from .utils.scada_deps import (get_kg_tepids_client, ScadaRefSignalResponseBuilder,
                                check_and_sync_scada_cache_by_ref_name,
                                get_scada_latest_deserializer, get_tep_ids_by_ref_name,
@@ -32,8 +39,7 @@ from .utils.scada_deps import (get_kg_tepids_client, ScadaRefSignalResponseBuild
                                check_retention, parse_datetime)
 from app.api.api_v1.api_deps import (end_date_back_hours_constraints, start_datetime_calculation,
                                      get_last_values_from_cache, get_kg_dgraph_client, get_request_flow,
-                                     get_asset_shortname, is_doggerbank_prod, check_installation_type_endpoint_params,
-                                     get_measurement_std_ref_names)
+                                     is_doggerbank_prod, check_installation_type_endpoint_params)
 
 router = APIRouter(
     prefix="",
@@ -47,6 +53,75 @@ signal_deserializer = get_scada_latest_deserializer()
 
 cache_helper = ScadaLocalCacheHelper(settings.SCADA.CACHE.SIZE, settings.SCADA.CACHE.TTL_MAX)
 
+
+def _synced_tep_ids(key: SyncKey) -> List[str]:
+    wf_id, ref_names, _ = key
+    return list(get_tep_ids_by_ref_names_tbr_ids(wf_id=wf_id, ref_sig_names=set(ref_names), tbr_ids=None,
+                                                 cache_helper=cache_helper))
+
+
+# measurement standard name -> ref names, the cache syncs seen and their tep ids, snapshotted to warm up new pods
+ref_name_index = ScadaRefNameIndex(scada_setting("REF_NAME_INDEX.SNAPSHOT_PATH"),
+                                   scada_setting("REF_NAME_INDEX.REFRESH_SECONDS"),
+                                   max_sync_keys=scada_setting("REF_NAME_INDEX.MAX_SYNC_KEYS"),
+                                   tep_ids_of=_synced_tep_ids)
+
+# credential of the cache syncs that run outside a client request, provisioned by the deployment
+service_identity = ScadaServiceIdentity(scada_setting("SERVICE_IDENTITY.TOKEN_FILE"),
+                                        scada_setting("SERVICE_IDENTITY.FLOW_TYPE"))
+# the KG clients of those syncs are resolved from their dependency providers, which must not need a request
+service_syncs_enabled = service_identity.enabled and all(
+    is_service_dependency(provider) for provider in (get_kg_tepids_client, get_kg_dgraph_client))
+if service_identity.enabled and not service_syncs_enabled:
+    logger.warning("SCADA KG client providers need request-scoped dependencies, syncs outside a request are "
+                   "disabled")
+
+
+def _service_cache_sync(key: SyncKey):
+    """Cache sync of a (wind farm, ref names) key with the service identity, for syncs outside a request."""
+    wf_id, ref_names, force_ref_name = key
+    with service_dependency(get_kg_tepids_client) as kg_tepids_client, \
+            service_dependency(get_kg_dgraph_client) as kg_dgraph_client:
+        return check_and_sync_scada_cache_by_ref_names(
+            wf_id=wf_id, ref_sig_names=set(ref_names),
+            kg_tepids_client=kg_tepids_client, kg_dgraph_client=kg_dgraph_client,
+            authorize=service_identity.authorize(), flow_type=service_identity.flow_type,
+            cache_helper=cache_helper, force_ref_name=force_ref_name)
+
+
+def _on_cache_synced(key: SyncKey):
+    ref_name_index.record_sync(key)
+
+
+# one in-flight cache sync per wind farm / ref names, concurrent requests wait for its result, stale keys are
+# refreshed in the background with the service identity
+cache_sync = ScadaCacheSyncCoordinator(fresh_ttl=scada_setting("CACHE.SYNC_FRESH_TTL"),
+                                       stale_ttl=scada_setting("CACHE.SYNC_STALE_TTL"),
+                                       on_synced=_on_cache_synced,
+                                       background_sync=_service_cache_sync if service_syncs_enabled else None)
+
+# renamed tep ids, historical series of the old tep ids are stitched to the new ones until the backfill is done
+tep_id_aliases = TepIdAliasIndex.from_csv_files(scada_setting("TEP_ID_ALIAS_FILES"))
+
+
+def _replay_cache_sync(key: SyncKey):
+    cache_sync.run(key=key, sync=lambda: _service_cache_sync(key))
+
+
+@router.on_event("startup")
+def warm_scada_ref_name_index():
+    # the cache syncs are only replayed with a service identity, the ref names are refreshed either way
+    ref_name_index.start_warm_up(replay_sync=_replay_cache_sync if service_syncs_enabled else None,
+                                 max_syncs=scada_setting("REF_NAME_INDEX.WARMUP_MAX_SYNCS"),
+                                 timeout_seconds=scada_setting("REF_NAME_INDEX.WARMUP_TIMEOUT_SECONDS"))
+    ref_name_index.start_background_refresh()
+
+
+@router.on_event("shutdown")
+def save_scada_ref_name_index():
+    ref_name_index.stop()
+
+
 @router.get(
     "/ts/scada-reference/latest/{scada_reference_signal_name}",
     description="Get latest time series data by SCADA Reference signal name",
@@ -54,6 +129,7 @@ cache_helper = ScadaLocalCacheHelper(settings.SCADA.CACHE.SIZE, settings.SCADA.C
     status_code=200,
     response_model=List[ScadaReferenceSignalSchema],
 )
+@count_protection_trips("lastScadaReferenceSignal")
 @breaker
 @limiter.limit(limiterSettings.SCADA_LIMITS)
 def get_scada_signals_latest_states_by_scada_reference_signal(
@@ -65,21 +141,29 @@ def get_scada_signals_latest_states_by_scada_reference_signal(
         kg_dgraph_client: KgDgraphClientGet = Depends(get_kg_dgraph_client),
         authorize: AuthJWT = Depends(),
 ):
+    timer = ScadaPhaseTimer("lastScadaReferenceSignal")
     flow_type = get_request_flow(request)
 
     auth_check(authorize, [READ_PER], flow_type=flow_type)
+    timer.lap("auth_check")
 
-    check_and_sync_scada_cache_by_ref_name(wf_id=offshore_wind_farm_id, ref_sig_name=scada_reference_signal_name,
-                                           kg_tepids_client=kg_tepids_client, kg_dgraph_client=kg_dgraph_client,
-                                           authorize=authorize, flow_type=flow_type, cache_helper=cache_helper)
+    cache_sync.run(
+        key=(offshore_wind_farm_id, frozenset([scada_reference_signal_name]), False),
+        sync=lambda: check_and_sync_scada_cache_by_ref_name(
+            wf_id=offshore_wind_farm_id, ref_sig_name=scada_reference_signal_name,
+            kg_tepids_client=kg_tepids_client, kg_dgraph_client=kg_dgraph_client,
+            authorize=authorize, flow_type=flow_type, cache_helper=cache_helper))
+    timer.lap("cache_sync")
 
     tep_ids = get_tep_ids_by_ref_name(wf_id=offshore_wind_farm_id, ref_sig_name=scada_reference_signal_name,
                                       tbr_id=offshore_wind_turbine_id, cache_helper=cache_helper)
+    timer.lap("tep_id_resolution")
 
     cache_values_to_fetch_from = get_scada_cache_latest_values_to_fetch_from()
 
     last_values = get_last_values_from_cache(tep_ids=tep_ids, cache_item_values=cache_values_to_fetch_from,
                                              item_deserializer=signal_deserializer)
+    timer.lap("cache_read")
     if not last_values:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No Scada signals found for latest values")
 
@@ -97,8 +181,10 @@ def get_scada_signals_latest_states_by_scada_reference_signal(
         is_doggerbank_prod=is_db_prod
     ).build()
 
-    response_body = jsonable_encoder(result)
-    return JSONResponse(status_code=status.HTTP_200_OK, content=response_body)
+    timer.lap("response_build")
+    response = build_scada_json_response(result, operation_id="lastScadaReferenceSignal")
+    timer.lap("encode")
+    return timer.finish(response)
 
 @router.get(
     "/ts/scada-measurement-standard-name/latest/{measurement_standard_name}",
@@ -107,6 +193,7 @@ def get_scada_signals_latest_states_by_scada_reference_signal(
     status_code=200,
     response_model=List[ScadaReferenceSignalSchema],
 )
+@count_protection_trips("lastScadaSignalByMeasStdName")
 @breaker
 @limiter.limit(limiterSettings.SCADA_LIMITS)
 def get_scada_signals_latest_states_by_measurement_standard_name(
@@ -118,29 +205,37 @@ def get_scada_signals_latest_states_by_measurement_standard_name(
         kg_dgraph_client: KgDgraphClientGet = Depends(get_kg_dgraph_client),
         authorize: AuthJWT = Depends(),
 ):
+    timer = ScadaPhaseTimer("lastScadaSignalByMeasStdName")
     flow_type = get_request_flow(request)
     auth_check(authorize, [READ_PER], flow_type=flow_type)
+    timer.lap("auth_check")
 
-    asset_short_name = get_asset_shortname(request)
-    ref_names = get_measurement_std_ref_names(asset_short_name=asset_short_name,
-                                              measurement_standard_name=measurement_standard_name)
+    ref_names = ref_name_index.get_ref_names(request=request,
+                                             measurement_standard_name=measurement_standard_name)
+    timer.lap("ref_names")
 
     if not ref_names:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail=f"Measurement standard name {measurement_standard_name} "
                                    f"is not supported yet, Please contact TEP Team")
 
-    check_and_sync_scada_cache_by_ref_names(wf_id=offshore_wind_farm_id, ref_sig_names=set(ref_names),
-                                            kg_tepids_client=kg_tepids_client, kg_dgraph_client=kg_dgraph_client,
-                                            authorize=authorize, flow_type=flow_type, cache_helper=cache_helper)
+    cache_sync.run(
+        key=(offshore_wind_farm_id, frozenset(ref_names), False),
+        sync=lambda: check_and_sync_scada_cache_by_ref_names(
+            wf_id=offshore_wind_farm_id, ref_sig_names=set(ref_names),
+            kg_tepids_client=kg_tepids_client, kg_dgraph_client=kg_dgraph_client,
+            authorize=authorize, flow_type=flow_type, cache_helper=cache_helper))
+    timer.lap("cache_sync")
 
     tep_ids = get_tep_ids_by_ref_names(wf_id=offshore_wind_farm_id, ref_sig_names=set(ref_names),
                                        tbr_id=offshore_wind_turbine_id, cache_helper=cache_helper)
+    timer.lap("tep_id_resolution")
 
     cache_values_to_fetch_from = get_scada_cache_latest_values_to_fetch_from()
 
     last_values = get_last_values_from_cache(tep_ids=tep_ids, cache_item_values=cache_values_to_fetch_from,
                                              item_deserializer=signal_deserializer)
+    timer.lap("cache_read")
     if not last_values:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No Scada signals found for latest values")
 
@@ -161,8 +256,89 @@ def get_scada_signals_latest_states_by_measurement_standard_name(
         ).build()
         result.extend(result_by_ref_name)
 
-    response_body = jsonable_encoder(result)
-    return JSONResponse(status_code=status.HTTP_200_OK, content=response_body)
+    timer.lap("response_build")
+    response = build_scada_json_response(result, operation_id="lastScadaSignalByMeasStdName")
+    timer.lap("encode")
+    return timer.finish(response)
+
+
+@router.get(
+    "/ts/scada-reference/latest",
+    description="Get latest time series data by SCADA Reference signal names for several wind farms",
+    operation_id="lastScadaReferenceSignalsByWindFarms",
+    status_code=200,
+    response_model=Dict[str, List[ScadaReferenceSignalSchema]],
+)
+@count_protection_trips("lastScadaReferenceSignalsByWindFarms")
+@breaker
+@limiter.limit(limiterSettings.SCADA_LIMITS)
+def get_scada_signals_latest_states_by_wind_farms(
+        request: Request,
+        offshore_wind_farm_ids: List[str] = Query(..., min_items=1, max_items=5),
+        scada_reference_signal_names: List[str] = Query(..., min_items=1, max_items=5),
+        kg_tepids_client: KgTepIdsGet = Depends(get_kg_tepids_client),
+        kg_dgraph_client: KgDgraphClientGet = Depends(get_kg_dgraph_client),
+        authorize: AuthJWT = Depends(),
+):
+    timer = ScadaPhaseTimer("lastScadaReferenceSignalsByWindFarms")
+    flow_type = get_request_flow(request)
+    auth_check(authorize, [READ_PER], flow_type=flow_type)
+    timer.lap("auth_check")
+
+    wf_ids = list(dict.fromkeys(offshore_wind_farm_ids))
+    ref_names = set(scada_reference_signal_names)
+    for wf_id in wf_ids:
+        cache_sync.run(
+            key=(wf_id, frozenset(ref_names), False),
+            sync=lambda wf_id=wf_id: check_and_sync_scada_cache_by_ref_names(
+                wf_id=wf_id, ref_sig_names=ref_names,
+                kg_tepids_client=kg_tepids_client, kg_dgraph_client=kg_dgraph_client,
+                authorize=authorize, flow_type=flow_type, cache_helper=cache_helper))
+    timer.lap("cache_sync")
+
+    tep_ids_by_wf_id = {
+        wf_id: list(set(get_tep_ids_by_ref_names(wf_id=wf_id, ref_sig_names=ref_names, tbr_id=None,
+                                                 cache_helper=cache_helper)))
+        for wf_id in wf_ids
+    }
+    timer.lap("tep_id_resolution")
+
+    # one multi-get per wind farm, latest values only carry their tag, not their tep id, so the values of a
+    # wind farm are the ones read for its tep ids
+    cache_values_to_fetch_from = get_scada_cache_latest_values_to_fetch_from()
+    last_values_by_wf_id = {
+        wf_id: get_last_values_from_cache(tep_ids=wf_tep_ids, cache_item_values=cache_values_to_fetch_from,
+                                          item_deserializer=signal_deserializer) if wf_tep_ids else []
+        for wf_id, wf_tep_ids in tep_ids_by_wf_id.items()
+    }
+    timer.lap("cache_read")
+    if not any(last_values_by_wf_id.values()):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No Scada signals found for latest values")
+
+    # specific case for doggerbank prod
+    is_db_prod = is_doggerbank_prod(request)
+
+    result: Dict[str, List[ScadaReferenceSignalSchema]] = {}
+    for wf_id in wf_ids:
+        result[wf_id] = []
+        if not last_values_by_wf_id[wf_id]:
+            continue
+        wf_values = sorted(last_values_by_wf_id[wf_id], key=lambda s: s.tag, reverse=False)
+        for ref_name in dict.fromkeys(scada_reference_signal_names):
+            result_by_ref_name: List[ScadaReferenceSignalSchema] = ScadaRefSignalResponseBuilder(
+                given_ref_name=ref_name,
+                wf_id=wf_id,
+                tbr_id=None,
+                scada_sig_values=wf_values,
+                cache_helper=cache_helper,
+                is_doggerbank_prod=is_db_prod
+            ).build()
+            result[wf_id].extend(result_by_ref_name)
+
+    timer.lap("response_build")
+    response = build_scada_json_response(result, operation_id="lastScadaReferenceSignalsByWindFarms")
+    timer.lap("encode")
+    return timer.finish(response)
 
 
 active_installation_type = settings.STORM_EP_INSTL_TYPE_ACTIVE
@@ -175,6 +351,7 @@ if active_installation_type:
         status_code=200,
         response_model=List[ScadaReferenceSignalSchema],
     )
+    @count_protection_trips("lastScadaInstallationTypeSignal")
     @breaker
     @limiter.limit(limiterSettings.SCADA_LIMITS)
     def get_scada_signals_latest_states_by_installation_type(
@@ -198,6 +375,7 @@ if active_installation_type:
             kg_dgraph_client: KgDgraphClientGet = Depends(get_kg_dgraph_client),
             authorize: AuthJWT = Depends(),
     ):
+        timer = ScadaPhaseTimer("lastScadaInstallationTypeSignal")
         flow_type = get_request_flow(request)
 
         check_installation_type_endpoint_params(flow_type=flow_type, installation_type=installation_type,
@@ -208,6 +386,7 @@ if active_installation_type:
                                                 is_latest_ep=True)
 
         auth_check(authorize, [READ_PER], flow_type=flow_type)
+        timer.lap("auth_check")
 
         # ref names in function of the installation type and the wind farm
         ref_names = []
@@ -216,9 +395,8 @@ if active_installation_type:
             if scada_reference_signal_name is not None:
                 ref_names = [str(scada_reference_signal_name)]
             elif measurement_standard_name is not None:
-                asset_short_name = get_asset_shortname(request)
-                ref_names = get_measurement_std_ref_names(asset_short_name=asset_short_name,
-                                                          measurement_standard_name=measurement_standard_name)
+                ref_names = ref_name_index.get_ref_names(request=request,
+                                                         measurement_standard_name=measurement_standard_name)
                 if not ref_names:
                     raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                                         detail=f"Measurement standard name {measurement_standard_name} "
@@ -231,29 +409,31 @@ if active_installation_type:
             ref_names = [str(installation_type.value)]
             force_ref_name = True
 
-        check_and_sync_scada_cache_by_ref_names(wf_id=offshore_wind_farm_id, ref_sig_names=set(ref_names),
-                                                kg_tepids_client=kg_tepids_client, kg_dgraph_client=kg_dgraph_client,
-                                                authorize=authorize, flow_type=flow_type, cache_helper=cache_helper,
-                                                force_ref_name=force_ref_name)
+        cache_sync.run(
+            key=(offshore_wind_farm_id, frozenset(ref_names), force_ref_name),
+            sync=lambda: check_and_sync_scada_cache_by_ref_names(
+                wf_id=offshore_wind_farm_id, ref_sig_names=set(ref_names),
+                kg_tepids_client=kg_tepids_client, kg_dgraph_client=kg_dgraph_client,
+                authorize=authorize, flow_type=flow_type, cache_helper=cache_helper,
+                force_ref_name=force_ref_name))
+        timer.lap("cache_sync")
 
         tep_ids = set()
         if scada_signal_names is not None:
-            scada_signal_names = list(set(scada_signal_names))
-            for sig_name in scada_signal_names:
-                sig_tup = cache_helper.get_tep_id_tbr_by_sig_name(wf_id=offshore_wind_farm_id,
-                                                                  given_ref_name=ref_names[0], sig_name=sig_name)
-                if sig_tup is not None and len(sig_tup) > 0 and sig_tup[1] is not None and len(sig_tup[1]) > 0:
-                    tep_ids.add(sig_tup[1])
+            tep_ids = set(get_tep_ids_by_sig_names(cache_helper, wf_id=offshore_wind_farm_id,
+                                                   given_ref_name=ref_names[0], sig_names=scada_signal_names))
         else:
             turbine_ids = set(offshore_wind_turbine_ids) if offshore_wind_turbine_ids is not None else None
             tep_ids = get_tep_ids_by_ref_names_tbr_ids(wf_id=offshore_wind_farm_id, ref_sig_names=set(ref_names),
                                                        tbr_ids=turbine_ids,
                                                        cache_helper=cache_helper)
+        timer.lap("tep_id_resolution")
 
         cache_values_to_fetch_from = get_scada_cache_latest_values_to_fetch_from()
 
         last_values = get_last_values_from_cache(tep_ids=tep_ids, cache_item_values=cache_values_to_fetch_from,
                                                  item_deserializer=signal_deserializer)
+        timer.lap("cache_read")
         if not last_values:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                                 detail="No Scada signals found for latest values")
@@ -277,8 +457,10 @@ if active_installation_type:
             ).build()
             result.extend(result_by_ref_name)
 
-        response_body = jsonable_encoder(result)
-        return JSONResponse(status_code=status.HTTP_200_OK, content=response_body)
+        timer.lap("response_build")
+        response = build_scada_json_response(result, operation_id="lastScadaInstallationTypeSignal")
+        timer.lap("encode")
+        return timer.finish(response)
 
 
 @router.get(
@@ -288,6 +470,7 @@ if active_installation_type:
     status_code=status.HTTP_200_OK,
     response_model=List[ScadaAggReferenceSignalSchema],
 )
+@count_protection_trips("historicalScadaAggReferenceSignals")
 @breaker
 @limiter.limit(limiterSettings.SCADA_LIMITS)
 def get_scada_reference_historical_agg_signals(
@@ -297,13 +480,20 @@ def get_scada_reference_historical_agg_signals(
         hours_back: int,
         request: Request,
         offshore_wind_turbine_id: Optional[str] = None,
+        max_points: Optional[int] = Query(None, ge=2, le=scada_setting("MAX_DOWNSAMPLE_POINTS"),
+                                          description="Maximum number of points per tep id, "
+                                                      "the series are downsampled on the server when set"),
+        downsample_method: ScadaDownsampleMethod = Query(ScadaDownsampleMethod.lttb,
+                                                         description="Downsampling method used with max_points"),
         db: Session = Depends(get_db),
         kg_tepids_client: KgTepIdsGet = Depends(get_kg_tepids_client),
         kg_dgraph_client: KgDgraphClientGet = Depends(get_kg_dgraph_client),
         authorize: AuthJWT = Depends(),
 ):
+    timer = ScadaPhaseTimer("historicalScadaAggReferenceSignals")
     flow_type = get_request_flow(request)
     auth_check(authorize, [READ_PER], flow_type=flow_type)
+    timer.lap("auth_check")
 
     max_hours_back = settings.SCADA.MAX_HOURS_BACK
 
@@ -316,22 +506,31 @@ def get_scada_reference_historical_agg_signals(
     # calculate start_datetime
     start_datetime = start_datetime_calculation(end_datetime, hours_back)
 
-    check_and_sync_scada_cache_by_ref_name(wf_id=offshore_wind_farm_id, ref_sig_name=scada_reference_signal_name,
-                                           kg_tepids_client=kg_tepids_client, kg_dgraph_client=kg_dgraph_client,
-                                           authorize=authorize, flow_type=flow_type, cache_helper=cache_helper)
+    cache_sync.run(
+        key=(offshore_wind_farm_id, frozenset([scada_reference_signal_name]), False),
+        sync=lambda: check_and_sync_scada_cache_by_ref_name(
+            wf_id=offshore_wind_farm_id, ref_sig_name=scada_reference_signal_name,
+            kg_tepids_client=kg_tepids_client, kg_dgraph_client=kg_dgraph_client,
+            authorize=authorize, flow_type=flow_type, cache_helper=cache_helper))
+    timer.lap("cache_sync")
 
     tep_ids = get_tep_ids_by_ref_name(wf_id=offshore_wind_farm_id, ref_sig_name=scada_reference_signal_name,
                                       tbr_id=offshore_wind_turbine_id, cache_helper=cache_helper)
+    timer.lap("tep_id_resolution")
 
     check_retention(end_datetime, hours_back)
 
-    historical_agg_values = get_scada_historical_agg_signals(
-        db=db, tep_ids=tep_ids, start_datetime=start_datetime, end_datetime=end_datetime)
+    historical_agg_values = get_scada_historical_agg_signals_partitioned(
+        db=db, tep_ids=tep_id_aliases.expand(tep_ids), start_datetime=start_datetime, end_datetime=end_datetime)
+    timer.lap("db_query")
 
     if not historical_agg_values:
-        return Response(status_code=status.HTTP_204_NO_CONTENT)
+        return timer.finish(Response(status_code=status.HTTP_204_NO_CONTENT))
 
     item_agg_values = from_scada_agg_sig_values_to_item_values(historical_agg_values)
+    item_agg_values = tep_id_aliases.stitch(item_agg_values)
+    if max_points is not None:
+        item_agg_values = downsample_item_values(item_agg_values, max_points=max_points, method=downsample_method)
 
     # specific case for doggerbank prod
     is_db_prod = is_doggerbank_prod(request)
@@ -347,8 +546,10 @@ def get_scada_reference_historical_agg_signals(
 
     check_response_data(result)
 
-    response_body = jsonable_encoder(result)
-    return JSONResponse(status_code=status.HTTP_200_OK, content=response_body)
+    timer.lap("response_build")
+    response = build_scada_json_response(result, operation_id="historicalScadaAggReferenceSignals")
+    timer.lap("encode")
+    return timer.finish(response)
 
 
 if active_installation_type:
@@ -359,6 +560,7 @@ if active_installation_type:
         status_code=status.HTTP_200_OK,
         response_model=List[ScadaAggReferenceSignalSchema],
     )
+    @count_protection_trips("historicalScadaAggDataInstallationTypeSignal")
     @breaker
     @limiter.limit(limiterSettings.SCADA_LIMITS)
     def get_scada_historical_agg_signals_by_installation_type(
@@ -381,11 +583,17 @@ if active_installation_type:
             scada_signal_names: Optional[List[str]] = Query(None,
                                                             description=f"Scada signal names",
                                                             max_items=5),
+            max_points: Optional[int] = Query(None, ge=2, le=scada_setting("MAX_DOWNSAMPLE_POINTS"),
+                                              description="Maximum number of points per tep id, "
+                                                          "the series are downsampled on the server when set"),
+            downsample_method: ScadaDownsampleMethod = Query(ScadaDownsampleMethod.lttb,
+                                                             description="Downsampling method used with max_points"),
             db: Session = Depends(get_db),
             kg_tepids_client: KgTepIdsGet = Depends(get_kg_tepids_client),
             kg_dgraph_client: KgDgraphClientGet = Depends(get_kg_dgraph_client),
             authorize: AuthJWT = Depends(),
     ):
+        timer = ScadaPhaseTimer("historicalScadaAggDataInstallationTypeSignal")
         flow_type = get_request_flow(request)
 
         check_installation_type_endpoint_params(flow_type=flow_type, installation_type=installation_type,
@@ -406,6 +614,7 @@ if active_installation_type:
         start_datetime = start_datetime_calculation(end_datetime, hours_back)
 
         auth_check(authorize, [READ_PER], flow_type=flow_type)
+        timer.lap("auth_check")
 
         # ref names in function of the installation type and the wind farm
         ref_names = []
@@ -414,9 +623,8 @@ if active_installation_type:
             if scada_reference_signal_name is not None:
                 ref_names = [str(scada_reference_signal_name)]
             elif measurement_standard_name is not None:
-                asset_short_name = get_asset_shortname(request)
-                ref_names = get_measurement_std_ref_names(asset_short_name=asset_short_name,
-                                                          measurement_standard_name=measurement_standard_name)
+                ref_names = ref_name_index.get_ref_names(request=request,
+                                                         measurement_standard_name=measurement_standard_name)
                 if not ref_names:
                     raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                                         detail=f"Measurement standard name {measurement_standard_name} "
@@ -429,33 +637,39 @@ if active_installation_type:
             ref_names = [str(installation_type.value)]
             force_ref_name = True
 
-        check_and_sync_scada_cache_by_ref_names(wf_id=offshore_wind_farm_id, ref_sig_names=set(ref_names),
-                                                kg_tepids_client=kg_tepids_client, kg_dgraph_client=kg_dgraph_client,
-                                                authorize=authorize, flow_type=flow_type, cache_helper=cache_helper,
-                                                force_ref_name=force_ref_name)
+        cache_sync.run(
+            key=(offshore_wind_farm_id, frozenset(ref_names), force_ref_name),
+            sync=lambda: check_and_sync_scada_cache_by_ref_names(
+                wf_id=offshore_wind_farm_id, ref_sig_names=set(ref_names),
+                kg_tepids_client=kg_tepids_client, kg_dgraph_client=kg_dgraph_client,
+                authorize=authorize, flow_type=flow_type, cache_helper=cache_helper,
+                force_ref_name=force_ref_name))
+        timer.lap("cache_sync")
 
         tep_ids = set()
         if scada_signal_names is not None:
-            scada_signal_names = list(set(scada_signal_names))
-            for sig_name in scada_signal_names:
-                sig_tup = cache_helper.get_tep_id_tbr_by_sig_name(wf_id=offshore_wind_farm_id,
-                                                                  given_ref_name=ref_names[0], sig_name=sig_name,
-                                                                  is_agg=True)
-                if sig_tup is not None and len(sig_tup) > 0 and sig_tup[1] is not None and len(sig_tup[1]) > 0:
-                    tep_ids.add(sig_tup[1])
+            tep_ids = set(get_tep_ids_by_sig_names(cache_helper, wf_id=offshore_wind_farm_id,
+                                                   given_ref_name=ref_names[0], sig_names=scada_signal_names,
+                                                   is_agg=True))
         else:
             turbine_ids = set(offshore_wind_turbine_ids) if offshore_wind_turbine_ids is not None else None
             tep_ids = get_tep_ids_by_ref_names_tbr_ids(wf_id=offshore_wind_farm_id, ref_sig_names=set(ref_names),
                                                        tbr_ids=turbine_ids,
                                                        cache_helper=cache_helper, is_agg=True)
+        timer.lap("tep_id_resolution")
 
         check_retention(end_datetime, hours_back)
-        historical_agg_values = get_scada_historical_agg_signals(
-            db=db, tep_ids=tep_ids, start_datetime=start_datetime, end_datetime=end_datetime)
+        historical_agg_values = get_scada_historical_agg_signals_partitioned(
+            db=db, tep_ids=tep_id_aliases.expand(tep_ids), start_datetime=start_datetime, end_datetime=end_datetime)
+        timer.lap("db_query")
         if not historical_agg_values:
-            return Response(status_code=status.HTTP_204_NO_CONTENT)
+            return timer.finish(Response(status_code=status.HTTP_204_NO_CONTENT))
 
         item_agg_values = from_scada_agg_sig_values_to_item_values(historical_agg_values)
+        item_agg_values = tep_id_aliases.stitch(item_agg_values)
+        if max_points is not None:
+            item_agg_values = downsample_item_values(item_agg_values, max_points=max_points,
+                                                     method=downsample_method)
         is_db_prod = False
         # specific case for doggerbank prod, only apply to wtb
         if installation_type == ScadaIntallationType.offshore_wind_turbine:
@@ -475,5 +689,7 @@ if active_installation_type:
 
         check_response_data(result)
 
-        response_body = jsonable_encoder(result)
-        return JSONResponse(status_code=status.HTTP_200_OK, content=response_body)
\ No newline at end of file
+        timer.lap("response_build")
+        response = build_scada_json_response(result, operation_id="historicalScadaAggDataInstallationTypeSignal")
+        timer.lap("encode")
+        return timer.finish(response)
\ No newline at end of file
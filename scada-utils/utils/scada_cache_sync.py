@@ -0,0 +1,141 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from fastapi_jwt_auth.exceptions import AuthJWTException
+
+from app.core.logger import logger
+
+AUTH_ERROR_STATUS_CODES = (401, 403)
+
+
+def is_auth_error(error: BaseException) -> bool:
+    """Errors that belong to the caller whose credentials ran the sync, not to the sync itself."""
+    return isinstance(error, AuthJWTException) or getattr(error, "status_code", None) in AUTH_ERROR_STATUS_CODES
+
+
+class _InFlightSync:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class ScadaCacheSyncCoordinator:
+    """
+    Single-flight coalescing for the SCADA cache synchronization.
+
+    Only one sync runs per key at a time, concurrent callers for the same key wait for the in-flight
+    sync and share its result (or its exception). An auth error of the leading caller is never shared,
+    as it says nothing about the other callers' credentials: the waiters run the sync again with theirs.
+    Once a key has been synced, calls within `fresh_ttl` seconds skip the sync, calls within `stale_ttl`
+    seconds return immediately and trigger a single background refresh (stale-while-revalidate).
+
+    The background refresh outlives the request, so it runs `background_sync(key)` (a sync with the
+    service identity and its own clients) rather than the caller's sync. Without background_sync, or with
+    a `stale_ttl` lower or equal to `fresh_ttl`, the stale window is disabled. on_synced, when given, is
+    called with the key after every successful sync.
+    """
+
+    def __init__(self, fresh_ttl: float = 0, stale_ttl: float = 0,
+                 on_synced: Optional[Callable[[Hashable], None]] = None,
+                 background_sync: Optional[Callable[[Hashable], Any]] = None,
+                 is_caller_error: Callable[[BaseException], bool] = is_auth_error):
+        self.fresh_ttl = fresh_ttl
+        self.stale_ttl = stale_ttl
+        self.on_synced = on_synced
+        self.background_sync = background_sync
+        self.is_caller_error = is_caller_error
+        self._lock = threading.Lock()
+        self._in_flight: Dict[Hashable, _InFlightSync] = {}
+        self._last_synced: Dict[Hashable, float] = {}
+        self._counters = {
+            "calls": 0,
+            "syncs": 0,
+            "coalesced": 0,
+            "fresh_hits": 0,
+            "stale_served": 0,
+            "background_refreshes": 0,
+            "errors": 0,
+            "caller_errors_retried": 0,
+        }
+
+    def run(self, key: Hashable, sync: Callable[[], Any]) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            self._counters["calls"] += 1
+            last_synced = self._last_synced.get(key)
+            age = now - last_synced if last_synced is not None else None
+
+            if age is not None and age < self.fresh_ttl:
+                self._counters["fresh_hits"] += 1
+                return None
+
+            if age is not None and age < self.stale_ttl and self.background_sync is not None:
+                self._counters["stale_served"] += 1
+                if key not in self._in_flight:
+                    self._in_flight[key] = _InFlightSync()
+                    self._counters["background_refreshes"] += 1
+                    threading.Thread(target=self._execute, args=(key, lambda: self.background_sync(key)),
+                                     daemon=True, name=f"scada-cache-refresh-{key}").start()
+                return None
+
+        while True:
+            with self._lock:
+                call = self._in_flight.get(key)
+                if call is None:
+                    call = self._in_flight[key] = _InFlightSync()
+                    is_leader = True
+                else:
+                    self._counters["coalesced"] += 1
+                    is_leader = False
+
+            if is_leader:
+                self._execute(key, sync)
+            else:
+                call.done.wait()
+                if call.error is not None and self.is_caller_error(call.error):
+                    with self._lock:
+                        self._counters["caller_errors_retried"] += 1
+                    continue
+
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+    def _execute(self, key: Hashable, sync: Callable[[], Any]):
+        with self._lock:
+            call = self._in_flight[key]
+            self._counters["syncs"] += 1
+        try:
+            call.result = sync()
+            with self._lock:
+                self._last_synced[key] = time.monotonic()
+            if self.on_synced is not None:
+                self.on_synced(key)
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                self._counters["errors"] += 1
+            logger.warning(f"SCADA cache sync failed for key {key}: {e}")
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            call.done.set()
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        with self._lock:
+            if key is None:
+                self._last_synced.clear()
+            else:
+                self._last_synced.pop(key, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self._counters)
+            stats["in_flight"] = len(self._in_flight)
+        # every call that did not run its own sync is a sync saved
+        stats["saved"] = stats["calls"] - stats["syncs"]
+        return stats
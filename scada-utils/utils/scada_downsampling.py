@@ -0,0 +1,133 @@
+import copy
+from collections import defaultdict
+from enum import Enum
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+# attributes of the aggregated item values returned by from_scada_agg_sig_values_to_item_values, each item
+# carries the min/max/avg/last aggregates of its interval
+ITEM_TEP_ID_ATTR = "tep_id"
+ITEM_TIME_ATTR = "timestamp"
+ITEM_MIN_ATTR = "min"
+ITEM_MAX_ATTR = "max"
+ITEM_AVG_ATTR = "avg"
+ITEM_LAST_ATTR = "last"
+
+
+class ScadaDownsampleMethod(str, Enum):
+    min = "min"
+    max = "max"
+    mean = "mean"
+    last = "last"
+    lttb = "lttb"
+
+
+def _epoch_seconds(items: Sequence[Any]) -> np.ndarray:
+    return np.fromiter((getattr(item, ITEM_TIME_ATTR).timestamp() for item in items), dtype=np.float64,
+                       count=len(items))
+
+
+def _values(items: Sequence[Any], attr: str) -> np.ndarray:
+    return np.fromiter((np.nan if getattr(item, attr) is None else getattr(item, attr) for item in items),
+                       dtype=np.float64, count=len(items))
+
+
+def _bucket_bounds(n: int, n_buckets: int) -> np.ndarray:
+    return np.linspace(0, n, n_buckets + 1).astype(np.int64)
+
+
+def bucket_aggregate(items: Sequence[Any], max_points: int, method: ScadaDownsampleMethod) -> List[Any]:
+    """
+    Reduces a time ordered series to at most max_points points, one per bucket of equal point count.
+
+    min/max keep the original item of each bucket with the lowest min / highest max, last keeps the last item
+    of each bucket. mean keeps the last item of the bucket (so its last aggregate) with avg replaced by the
+    bucket mean of avg, and min/max by the bucket min of min / max of max.
+    """
+    n = len(items)
+    if n <= max_points:
+        return list(items)
+
+    bounds = _bucket_bounds(n, max_points)
+    starts, ends = bounds[:-1], bounds[1:]
+
+    if method == ScadaDownsampleMethod.last:
+        return [items[i] for i in ends - 1]
+
+    if method == ScadaDownsampleMethod.mean:
+        # nan aware reductions per bucket with reduceat, empty (all nan) buckets keep None
+        avgs = _values(items, ITEM_AVG_ATTR)
+        valid = ~np.isnan(avgs)
+        sums = np.add.reduceat(np.where(valid, avgs, 0.0), starts)
+        counts = np.add.reduceat(valid.astype(np.int64), starts)
+        mins = np.minimum.reduceat(np.nan_to_num(_values(items, ITEM_MIN_ATTR), nan=np.inf), starts)
+        maxs = np.maximum.reduceat(np.nan_to_num(_values(items, ITEM_MAX_ATTR), nan=-np.inf), starts)
+        result = []
+        for end, total, count, low, high in zip(ends, sums, counts, mins, maxs):
+            item = copy.copy(items[end - 1])
+            setattr(item, ITEM_AVG_ATTR, float(total / count) if count else None)
+            setattr(item, ITEM_MIN_ATTR, float(low) if np.isfinite(low) else None)
+            setattr(item, ITEM_MAX_ATTR, float(high) if np.isfinite(high) else None)
+            result.append(item)
+        return result
+
+    is_min = method == ScadaDownsampleMethod.min
+    fill = np.inf if is_min else -np.inf
+    values = _values(items, ITEM_MIN_ATTR if is_min else ITEM_MAX_ATTR)
+    filled = np.where(np.isnan(values), fill, values)
+    # argmin / argmax per bucket through a padded 2d view, buckets differ by at most one point
+    width = int((ends - starts).max())
+    offsets = starts[:, None] + np.arange(width)[None, :]
+    in_bucket = offsets < ends[:, None]
+    padded = np.where(in_bucket, filled[np.minimum(offsets, n - 1)], fill)
+    picks = padded.argmin(axis=1) if is_min else padded.argmax(axis=1)
+    return [items[i] for i in starts + picks]
+
+
+def lttb(items: Sequence[Any], max_points: int) -> List[Any]:
+    """
+    Largest-Triangle-Three-Buckets selection on avg of at most max_points original items, first and last are kept.
+    """
+    n = len(items)
+    if n <= max_points or max_points < 3:
+        return list(items) if n <= max_points else [items[0], items[-1]]
+
+    x = _epoch_seconds(items)
+    y = _values(items, ITEM_AVG_ATTR)
+    y = np.where(np.isnan(y), 0.0, y)
+
+    # inner buckets over items[1:-1]
+    bounds = 1 + _bucket_bounds(n - 2, max_points - 2)
+    selected = [0]
+    a = 0
+    for b in range(max_points - 2):
+        start, end = bounds[b], bounds[b + 1]
+        if b + 2 < len(bounds):
+            next_start, next_end = bounds[b + 1], bounds[b + 2]
+        else:
+            next_start, next_end = n - 1, n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        areas = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(areas.argmax())
+        selected.append(a)
+    selected.append(n - 1)
+    return [items[i] for i in selected]
+
+
+def downsample_item_values(items: Sequence[Any], max_points: int,
+                           method: ScadaDownsampleMethod = ScadaDownsampleMethod.lttb) -> List[Any]:
+    """Downsamples each tep id series of the aggregated item values independently to at most max_points."""
+    series: Dict[str, List[Any]] = defaultdict(list)
+    for item in items:
+        series[getattr(item, ITEM_TEP_ID_ATTR)].append(item)
+
+    result = []
+    for tep_items in series.values():
+        tep_items.sort(key=lambda item: getattr(item, ITEM_TIME_ATTR))
+        if method == ScadaDownsampleMethod.lttb:
+            result.extend(lttb(tep_items, max_points))
+        else:
+            result.extend(bucket_aggregate(tep_items, max_points, method))
+    return result
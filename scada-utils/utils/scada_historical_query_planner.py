@@ -0,0 +1,80 @@
+import heapq
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from operator import attrgetter
+from typing import Any, Iterable, List, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.logger import logger
+from app.crud.scada.scada_signals_historicalvalue_crud import get_scada_historical_agg_signals
+
+from .scada_settings import scada_setting
+
+QueryPart = Tuple[List[str], datetime, datetime]
+
+# get_scada_historical_agg_signals returns its rows ordered by tep id then timestamp
+ROW_TEP_ID_ATTR = "tep_id"
+ROW_TIME_ATTR = "timestamp"
+historical_row_sort_key = attrgetter(ROW_TEP_ID_ATTR, ROW_TIME_ATTR)
+
+# shared by all requests so the number of concurrent partition queries (and pooled connections) stays bounded
+_query_executor = ThreadPoolExecutor(max_workers=scada_setting("HISTORICAL_QUERY_MAX_WORKERS"),
+                                     thread_name_prefix="scada-historical-query")
+
+
+def plan_historical_query(tep_ids: Iterable[str], start_datetime: datetime, end_datetime: datetime,
+                          tep_id_chunk_size: int, partition_hours: int) -> List[QueryPart]:
+    """
+    Splits a historical query into tep id chunks and time partitions, ordered by time partition then chunk.
+
+    Partitions do not overlap: each one ends one microsecond before the next one starts, the last one ends
+    at end_datetime.
+    """
+    sorted_tep_ids = sorted(tep_ids)
+    chunks = [sorted_tep_ids[i:i + tep_id_chunk_size] for i in range(0, len(sorted_tep_ids), tep_id_chunk_size)]
+
+    partitions = []
+    partition = timedelta(hours=partition_hours)
+    partition_start = start_datetime
+    while partition_start + partition < end_datetime:
+        partition_end = partition_start + partition
+        partitions.append((partition_start, partition_end - timedelta(microseconds=1)))
+        partition_start = partition_end
+    partitions.append((partition_start, end_datetime))
+
+    return [(chunk, part_start, part_end) for part_start, part_end in partitions for chunk in chunks]
+
+
+def get_scada_historical_agg_signals_partitioned(db: Session, tep_ids: Iterable[str], start_datetime: datetime,
+                                                 end_datetime: datetime) -> List[Any]:
+    """
+    get_scada_historical_agg_signals for large tep id sets and windows.
+
+    Requests above SCADA.HISTORICAL_QUERY_TEP_ID_CHUNK_SIZE tep ids or SCADA.HISTORICAL_QUERY_PARTITION_HOURS
+    hours (either limit unset: not split on it) are split by plan_historical_query and run in the bounded
+    query pool, each part on its own session from the connection pool of the request session. Each part comes
+    back in the crud's (tep id, timestamp) order and the parts are merged on that key, so a split query returns
+    the rows in the same order as a single one.
+    """
+    tep_ids = list(tep_ids)
+    tep_id_chunk_size = scada_setting("HISTORICAL_QUERY_TEP_ID_CHUNK_SIZE") or len(tep_ids) or 1
+    partition_hours = scada_setting("HISTORICAL_QUERY_PARTITION_HOURS")
+    window_hours = (end_datetime - start_datetime) / timedelta(hours=1)
+
+    if len(tep_ids) <= tep_id_chunk_size and (partition_hours is None or window_hours <= partition_hours):
+        return get_scada_historical_agg_signals(db=db, tep_ids=tep_ids, start_datetime=start_datetime,
+                                                end_datetime=end_datetime)
+
+    parts = plan_historical_query(tep_ids, start_datetime, end_datetime, tep_id_chunk_size,
+                                  partition_hours or max(window_hours, 1))
+    logger.debug(f"Historical query for {len(tep_ids)} tep ids split into {len(parts)} parts")
+    engine = db.get_bind()
+
+    def run_part(part: QueryPart) -> List[Any]:
+        chunk, part_start, part_end = part
+        with Session(bind=engine) as session:
+            return list(get_scada_historical_agg_signals(db=session, tep_ids=chunk, start_datetime=part_start,
+                                                         end_datetime=part_end) or [])
+
+    return list(heapq.merge(*_query_executor.map(run_part, parts), key=historical_row_sort_key))
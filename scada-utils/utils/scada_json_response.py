@@ -0,0 +1,19 @@
+from typing import Any, Iterable
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from starlette import status
+
+from .scada_orjson_response import ORJSONScadaResponse
+from .scada_settings import scada_setting
+
+
+def use_orjson_response(operation_id: str) -> bool:
+    return operation_id in scada_setting("ORJSON_OPERATION_IDS")
+
+
+def build_scada_json_response(result: Iterable[Any], operation_id: str,
+                              status_code: int = status.HTTP_200_OK) -> JSONResponse:
+    if use_orjson_response(operation_id):
+        return ORJSONScadaResponse(status_code=status_code, content=result)
+    return JSONResponse(status_code=status_code, content=jsonable_encoder(result))
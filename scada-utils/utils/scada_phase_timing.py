@@ -0,0 +1,76 @@
+import functools
+import time
+from typing import Callable, List, Tuple
+
+from circuitbreaker import CircuitBreakerError
+from prometheus_client import Counter, Histogram
+from slowapi.errors import RateLimitExceeded
+from starlette.responses import Response
+
+from .scada_settings import scada_setting
+
+SCADA_PHASE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+scada_phase_seconds = Histogram(
+    "scada_endpoint_phase_seconds",
+    "Time spent per phase of the SCADA endpoints",
+    ["operation_id", "phase"],
+    buckets=SCADA_PHASE_BUCKETS,
+)
+
+scada_protection_trips = Counter(
+    "scada_endpoint_protection_trips_total",
+    "Requests rejected by the SCADA circuit breaker or rate limiter",
+    ["operation_id", "protection"],
+)
+
+
+class ScadaPhaseTimer:
+    """
+    Lap timer for the phases of a SCADA endpoint request.
+
+    Each lap(phase) observes the time elapsed since the previous lap (or the timer creation) in the
+    scada_endpoint_phase_seconds histogram. finish(response) observes the total and, when
+    SCADA.SERVER_TIMING_HEADER is enabled, adds the phases as a Server-Timing header.
+    """
+
+    def __init__(self, operation_id: str):
+        self.operation_id = operation_id
+        self.phases: List[Tuple[str, float]] = []
+        self._start = self._last = time.perf_counter()
+
+    def lap(self, phase: str):
+        now = time.perf_counter()
+        elapsed = now - self._last
+        self._last = now
+        self.phases.append((phase, elapsed))
+        scada_phase_seconds.labels(operation_id=self.operation_id, phase=phase).observe(elapsed)
+
+    def server_timing(self, total: float) -> str:
+        entries = [f"{phase};dur={elapsed * 1000:.2f}" for phase, elapsed in self.phases]
+        entries.append(f"total;dur={total * 1000:.2f}")
+        return ", ".join(entries)
+
+    def finish(self, response: Response) -> Response:
+        total = time.perf_counter() - self._start
+        scada_phase_seconds.labels(operation_id=self.operation_id, phase="total").observe(total)
+        if scada_setting("SERVER_TIMING_HEADER"):
+            response.headers["Server-Timing"] = self.server_timing(total)
+        return response
+
+
+def count_protection_trips(operation_id: str) -> Callable:
+    """Counts the requests of an endpoint rejected by the circuit breaker or the rate limiter, then re-raises."""
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                return func(*args, **kwargs)
+            except CircuitBreakerError:
+                scada_protection_trips.labels(operation_id=operation_id, protection="circuit_breaker").inc()
+                raise
+            except RateLimitExceeded:
+                scada_protection_trips.labels(operation_id=operation_id, protection="rate_limiter").inc()
+                raise
+        return wrapper
+    return decorator
@@ -0,0 +1,211 @@
+import mmap
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, FrozenSet, List, Optional, Tuple
+
+import orjson
+from fastapi import Request
+
+from app.core.logger import logger
+from app.api.api_v1.api_deps import get_asset_shortname, get_measurement_std_ref_names
+
+SyncKey = Tuple[str, FrozenSet[str], bool]
+
+
+class ScadaRefNameIndex:
+    """
+    Measurement standard name -> ref names index, plus the most recent (wind farm, ref names) cache syncs and
+    the tep ids they resolved to.
+
+    The index is saved as a JSON snapshot and memory-mapped back at startup, where the known measurement
+    standard names are re-resolved and the most recent recorded cache syncs replayed in a background thread
+    (bounded in count and time) so a new pod serves its first requests warm without delaying its startup.
+    A background thread refreshes the ref names and saves the snapshot every refresh_seconds.
+
+    tep_ids_of, when given, reads the tep ids of a synced key from the cache helper. They are saved with the
+    key, and the warm-up reports the keys whose tep ids changed since the snapshot.
+
+    Only values that resolved are kept (ref names of supported measurement standard names, keys of successful
+    syncs) and each map is capped, as their keys come from client input. Asset short names are not cached,
+    get_asset_shortname may read more of the request than its Host header.
+    """
+
+    def __init__(self, snapshot_path: Optional[str], refresh_seconds: float, max_sync_keys: int = 1000,
+                 max_ref_names: int = 10000, tep_ids_of: Optional[Callable[[SyncKey], List[str]]] = None):
+        self.snapshot_path = snapshot_path
+        self.refresh_seconds = refresh_seconds
+        self.max_sync_keys = max_sync_keys
+        self.max_ref_names = max_ref_names
+        self.tep_ids_of = tep_ids_of
+        self._lock = threading.Lock()
+        self._ref_names: Dict[Tuple[str, str], List[str]] = {}
+        # least recently synced first
+        self._sync_keys: "OrderedDict[SyncKey, None]" = OrderedDict()
+        # sorted tep ids of the recorded syncs, as of the last snapshot load, save or warm-up replay
+        self._tep_ids: Dict[SyncKey, List[str]] = {}
+        self._stop = threading.Event()
+        self._refresh_thread: Optional[threading.Thread] = None
+        self._warm_thread: Optional[threading.Thread] = None
+
+    def get_ref_names(self, request: Request, measurement_standard_name: str) -> List[str]:
+        key = (get_asset_shortname(request), measurement_standard_name)
+        ref_names = self._ref_names.get(key)
+        if ref_names is None:
+            ref_names = get_measurement_std_ref_names(asset_short_name=key[0],
+                                                      measurement_standard_name=measurement_standard_name)
+            # unsupported names are not indexed, they may be added to the measurement standard later
+            if ref_names and len(self._ref_names) < self.max_ref_names:
+                with self._lock:
+                    self._ref_names[key] = list(ref_names)
+        return ref_names
+
+    def _add_sync_key(self, key: SyncKey):
+        self._sync_keys[key] = None
+        self._sync_keys.move_to_end(key)
+        while len(self._sync_keys) > self.max_sync_keys:
+            evicted, _ = self._sync_keys.popitem(last=False)
+            self._tep_ids.pop(evicted, None)
+
+    def record_sync(self, key: SyncKey):
+        with self._lock:
+            self._add_sync_key(key)
+
+    def get_tep_ids(self, key: SyncKey) -> Optional[List[str]]:
+        """Sorted tep ids of a recorded sync as of the last snapshot load, save or warm-up replay, if known."""
+        return self._tep_ids.get(key)
+
+    def _resolve_tep_ids(self, key: SyncKey) -> Optional[List[str]]:
+        if self.tep_ids_of is None:
+            return None
+        try:
+            return sorted(self.tep_ids_of(key))
+        except Exception as e:
+            logger.warning(f"Tep ids of the SCADA cache sync {key} could not be read: {e}")
+            return None
+
+    def load_snapshot(self) -> bool:
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path) \
+                or os.path.getsize(self.snapshot_path) == 0:
+            return False
+        with open(self.snapshot_path, "rb") as file, \
+                mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            snapshot = orjson.loads(memoryview(mapped))
+        with self._lock:
+            for asset, msn, ref_names in snapshot["ref_names"][:self.max_ref_names]:
+                self._ref_names[(asset, msn)] = ref_names
+            # saved least recently synced first, tep ids added after the first snapshots
+            for wf_id, ref_names, force_ref_name, *tep_ids in snapshot["cache_syncs"]:
+                key = (wf_id, frozenset(ref_names), force_ref_name)
+                self._add_sync_key(key)
+                if tep_ids and tep_ids[0] is not None:
+                    self._tep_ids[key] = tep_ids[0]
+        logger.info(f"Loaded SCADA ref name snapshot {self.snapshot_path}: {len(self._ref_names)} measurement "
+                    f"standard names, {len(self._sync_keys)} cache syncs, tep ids of {len(self._tep_ids)}")
+        return True
+
+    def save_snapshot(self):
+        if not self.snapshot_path:
+            return
+        with self._lock:
+            sync_keys = list(self._sync_keys)
+        # read from the cache helper outside the lock, the last known tep ids are kept when it has none
+        tep_ids = {key: self._resolve_tep_ids(key) or self._tep_ids.get(key) for key in sync_keys}
+        with self._lock:
+            for key, key_tep_ids in tep_ids.items():
+                if key_tep_ids is not None and key in self._sync_keys:
+                    self._tep_ids[key] = key_tep_ids
+            snapshot = {
+                "ref_names": [[asset, msn, ref_names] for (asset, msn), ref_names in self._ref_names.items()],
+                "cache_syncs": [[wf_id, sorted(ref_names), force_ref_name,
+                                 tep_ids[(wf_id, ref_names, force_ref_name)]]
+                                for wf_id, ref_names, force_ref_name in sync_keys],
+            }
+        tmp_path = f"{self.snapshot_path}.tmp"
+        with open(tmp_path, "wb") as file:
+            file.write(orjson.dumps(snapshot))
+        os.replace(tmp_path, self.snapshot_path)
+
+    def refresh(self):
+        with self._lock:
+            keys = list(self._ref_names)
+        for asset_short_name, measurement_standard_name in keys:
+            try:
+                ref_names = get_measurement_std_ref_names(asset_short_name=asset_short_name,
+                                                          measurement_standard_name=measurement_standard_name)
+            except Exception as e:
+                logger.warning(f"Refresh of ref names for {measurement_standard_name} failed: {e}")
+                continue
+            with self._lock:
+                if ref_names:
+                    self._ref_names[(asset_short_name, measurement_standard_name)] = list(ref_names)
+                else:
+                    self._ref_names.pop((asset_short_name, measurement_standard_name), None)
+
+    def warm(self, replay_sync: Optional[Callable[[SyncKey], None]], max_syncs: int, timeout_seconds: float):
+        """
+        Loads the snapshot, refreshes the ref names and replays the max_syncs most recent cache syncs, stopping
+        once timeout_seconds have passed. No sync is replayed without replay_sync.
+        """
+        deadline = time.monotonic() + timeout_seconds
+        try:
+            self.load_snapshot()
+        except Exception as e:
+            logger.warning(f"SCADA ref name snapshot {self.snapshot_path} could not be loaded: {e}")
+        self.refresh()
+        if replay_sync is None:
+            return
+        with self._lock:
+            sync_keys = list(reversed(self._sync_keys))[:max_syncs]
+        replayed = changed = 0
+        for key in sync_keys:
+            if self._stop.is_set() or time.monotonic() > deadline:
+                logger.warning(f"SCADA cache warm-up stopped after {replayed} of {len(sync_keys)} syncs")
+                break
+            try:
+                replay_sync(key)
+                replayed += 1
+            except Exception as e:
+                logger.warning(f"SCADA cache warm-up failed for {key}: {e}")
+                continue
+            tep_ids = self._resolve_tep_ids(key)
+            if tep_ids is not None:
+                with self._lock:
+                    snapshot_tep_ids = self._tep_ids.get(key)
+                    if snapshot_tep_ids is not None and snapshot_tep_ids != tep_ids:
+                        changed += 1
+                    if key in self._sync_keys:
+                        self._tep_ids[key] = tep_ids
+        else:
+            logger.info(f"SCADA cache warm-up replayed {replayed} of {len(sync_keys)} syncs")
+        if changed:
+            logger.info(f"SCADA cache warm-up: tep ids of {changed} syncs changed since the snapshot")
+
+    def start_warm_up(self, replay_sync: Optional[Callable[[SyncKey], None]], max_syncs: int,
+                      timeout_seconds: float):
+        if self._warm_thread is None:
+            self._warm_thread = threading.Thread(target=self.warm, args=(replay_sync, max_syncs, timeout_seconds),
+                                                 daemon=True, name="scada-ref-name-index-warm-up")
+            self._warm_thread.start()
+
+    def _refresh_loop(self):
+        while not self._stop.wait(self.refresh_seconds):
+            try:
+                self.refresh()
+                self.save_snapshot()
+            except Exception as e:
+                logger.warning(f"SCADA ref name index refresh failed: {e}")
+
+    def start_background_refresh(self):
+        if self._refresh_thread is None:
+            self._refresh_thread = threading.Thread(target=self._refresh_loop, daemon=True,
+                                                    name="scada-ref-name-index-refresh")
+            self._refresh_thread.start()
+
+    def stop(self):
+        self._stop.set()
+        try:
+            self.save_snapshot()
+        except Exception as e:
+            logger.warning(f"SCADA ref name snapshot {self.snapshot_path} could not be saved: {e}")
@@ -0,0 +1,76 @@
+import inspect
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional
+
+from fastapi_jwt_auth import AuthJWT
+from starlette.requests import Request
+
+
+class ScadaServiceIdentity:
+    """
+    Credential of the API itself for the SCADA cache syncs that run outside a client request (startup warm-up,
+    stale-while-revalidate refreshes), so they never reuse a client's token or request-scoped clients.
+
+    The access token is not minted by the API: it is read from token_file, provisioned by the deployment
+    (e.g. a mounted secret kept up to date by the platform), re-read whenever the file changes and presented to
+    the sync as the AuthJWT of a request-less scope. Without a token file the identity is disabled and those
+    syncs are skipped.
+    """
+
+    def __init__(self, token_file: Optional[str], flow_type: Any):
+        self.token_file = token_file
+        self.flow_type = flow_type
+        self._lock = threading.Lock()
+        self._token: Optional[str] = None
+        self._token_mtime: Optional[int] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.token_file)
+
+    def _access_token(self) -> str:
+        with self._lock:
+            mtime = os.stat(self.token_file).st_mtime_ns
+            if self._token is None or mtime != self._token_mtime:
+                with open(self.token_file) as file:
+                    token = file.read().strip()
+                if not token:
+                    raise RuntimeError(f"SCADA service token file {self.token_file} is empty")
+                self._token, self._token_mtime = token, mtime
+            return self._token
+
+    def authorize(self) -> AuthJWT:
+        if not self.enabled:
+            raise RuntimeError("No SCADA service identity configured")
+        scope = {"type": "http", "method": "GET", "path": "/", "query_string": b"",
+                 "headers": [(b"authorization", f"Bearer {self._access_token()}".encode("latin-1"))]}
+        return AuthJWT(req=Request(scope))
+
+
+def is_service_dependency(provider: Callable) -> bool:
+    """
+    Whether a FastAPI dependency provider can be resolved outside a request: no parameters (a parameter is a
+    sub-dependency or request input) and synchronous, as the syncs outside a request run in worker threads.
+    """
+    return not inspect.signature(provider).parameters and not (inspect.iscoroutinefunction(provider)
+                                                               or inspect.isasyncgenfunction(provider))
+
+
+@contextmanager
+def service_dependency(provider: Callable) -> Iterator[Any]:
+    """
+    Value of a FastAPI dependency provider for a sync outside a request, resolved as FastAPI would: generator
+    providers yield the value and are closed once the sync is done.
+    """
+    if not is_service_dependency(provider):
+        raise TypeError(f"{provider.__name__} cannot be resolved outside a request")
+    if not inspect.isgeneratorfunction(provider):
+        yield provider()
+        return
+    values = provider()
+    try:
+        yield next(values)
+    finally:
+        values.close()
@@ -0,0 +1,38 @@
+from typing import Any
+
+from app.core.config import settings
+
+# SCADA settings added with the cache sync, response, downsampling, alias, timing, query planner, ref name
+# index and service identity changes. Deployments whose config does not define them yet keep the previous
+# behaviour.
+SCADA_SETTING_DEFAULTS = {
+    "CACHE.SYNC_FRESH_TTL": 0,
+    "CACHE.SYNC_STALE_TTL": 0,
+    "ORJSON_OPERATION_IDS": (),
+    "MAX_DOWNSAMPLE_POINTS": 10000,
+    "TEP_ID_ALIAS_FILES": (),
+    "SERVER_TIMING_HEADER": False,
+    # None: historical queries are not split
+    "HISTORICAL_QUERY_TEP_ID_CHUNK_SIZE": None,
+    "HISTORICAL_QUERY_PARTITION_HOURS": None,
+    "HISTORICAL_QUERY_MAX_WORKERS": 4,
+    # None: no snapshot, the index starts empty
+    "REF_NAME_INDEX.SNAPSHOT_PATH": None,
+    "REF_NAME_INDEX.REFRESH_SECONDS": 300,
+    "REF_NAME_INDEX.MAX_SYNC_KEYS": 1000,
+    "REF_NAME_INDEX.WARMUP_MAX_SYNCS": 200,
+    "REF_NAME_INDEX.WARMUP_TIMEOUT_SECONDS": 120,
+    # None: no service identity, syncs outside a client request (warm-up, background refresh) are skipped
+    "SERVICE_IDENTITY.TOKEN_FILE": None,
+    "SERVICE_IDENTITY.FLOW_TYPE": None,
+}
+
+
+def scada_setting(path: str) -> Any:
+    """settings.SCADA.<path> (dotted), or its SCADA_SETTING_DEFAULTS value when the config does not define it."""
+    value = settings.SCADA
+    for name in path.split("."):
+        value = getattr(value, name, None)
+        if value is None:
+            return SCADA_SETTING_DEFAULTS[path]
+    return value
@@ -0,0 +1,25 @@
+from typing import TYPE_CHECKING, Dict, Iterable, List
+
+if TYPE_CHECKING:
+    from app.clients.scada.utils.cache_scada_signals_helper import ScadaLocalCacheHelper
+
+
+def get_tep_ids_by_sig_names(cache_helper: "ScadaLocalCacheHelper", wf_id: str, given_ref_name: str,
+                             sig_names: Iterable[str], is_agg: bool = False) -> List[str]:
+    """
+    Bulk lookup of scada signal names in the cache helper, after the cache sync of the wind farm / ref name.
+
+    Parameters:
+        cache_helper: the synced ScadaLocalCacheHelper, the only copy of the signal name -> tep id entries
+        sig_names: signal names, duplicates are looked up once
+
+    Returns:
+        The tep ids of the resolved names, in the order of the names, unresolved names skipped, duplicates removed.
+    """
+    tep_ids: Dict[str, None] = {}
+    for sig_name in dict.fromkeys(sig_names):
+        sig_tup = cache_helper.get_tep_id_tbr_by_sig_name(wf_id=wf_id, given_ref_name=given_ref_name,
+                                                          sig_name=sig_name, is_agg=is_agg)
+        if sig_tup is not None and len(sig_tup) > 0 and sig_tup[1] is not None and len(sig_tup[1]) > 0:
+            tep_ids[sig_tup[1]] = None
+    return list(tep_ids)
@@ -0,0 +1,152 @@
+import copy
+import csv
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from app.core.logger import logger
+from .scada_downsampling import ITEM_TEP_ID_ATTR, ITEM_TIME_ATTR
+
+OLD_TEP_ID_COL = "old tep_id"
+NEW_TEP_ID_COL = "new tep_id"
+CUTOVER_COL = "createdTimeNewTag"
+
+
+def _parse_cutover(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        # createdTimeNewTag is written by pandas from naive UTC datetimes
+        return datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    except ValueError:
+        logger.warning(f"Invalid {CUTOVER_COL} value in tep id alias file: {value}")
+        return None
+
+
+def _as_comparable(cutover: datetime, timestamp: datetime) -> datetime:
+    if timestamp.tzinfo is not None and cutover.tzinfo is None:
+        return cutover.replace(tzinfo=timezone.utc)
+    if timestamp.tzinfo is None and cutover.tzinfo is not None:
+        return cutover.astimezone(timezone.utc).replace(tzinfo=None)
+    return cutover
+
+
+class TepIdAliasIndex:
+    """
+    In-memory index of renamed tep ids (old tep_id -> new tep_id), loaded from the tep id change files.
+
+    Historical queries for a new tep id are expanded to its old tep ids, and the returned series are stitched
+    at the cutover time: old tep id points before the cutover are relabelled to the new tep id, points after
+    it come from the new tep id only. The cutover is the earliest of createdTimeNewTag and the first point of
+    the new tep id, so both series never overlap.
+
+    Renames are followed transitively across change sets: with A -> B and B -> C, a query for C also reads
+    A and B, and A points are relabelled to C when they are before the cutover of both A -> B and B -> C.
+    """
+
+    def __init__(self):
+        self._old_by_new: Dict[str, Set[str]] = {}
+        self._new_by_old: Dict[str, str] = {}
+        self._cutover_by_old: Dict[str, Optional[datetime]] = {}
+
+    def __len__(self):
+        return len(self._new_by_old)
+
+    def add(self, old_tep_id: str, new_tep_id: str, cutover: Optional[datetime] = None):
+        if not old_tep_id or not new_tep_id or old_tep_id == new_tep_id:
+            return
+        self._new_by_old[old_tep_id] = new_tep_id
+        self._cutover_by_old[old_tep_id] = cutover
+        self._old_by_new.setdefault(new_tep_id, set()).add(old_tep_id)
+
+    @classmethod
+    def from_csv(cls, csv_file_path: str) -> "TepIdAliasIndex":
+        index = cls()
+        with open(csv_file_path, newline="") as file:
+            for row in csv.DictReader(file):
+                index.add((row.get(OLD_TEP_ID_COL) or "").strip(), (row.get(NEW_TEP_ID_COL) or "").strip(),
+                          _parse_cutover(row.get(CUTOVER_COL)))
+        logger.info(f"Loaded {len(index)} tep id aliases from {csv_file_path}")
+        return index
+
+    @classmethod
+    def from_csv_files(cls, csv_file_paths: Iterable[str]) -> "TepIdAliasIndex":
+        """Index of all the given files, a missing or unreadable file is logged and skipped."""
+        index = cls()
+        for csv_file_path in csv_file_paths:
+            try:
+                loaded = cls.from_csv(csv_file_path)
+            except (OSError, ValueError, csv.Error) as e:
+                logger.error(f"Tep id alias file {csv_file_path} skipped, it could not be read: {e}")
+                continue
+            for old_tep_id, new_tep_id in loaded._new_by_old.items():
+                index.add(old_tep_id, new_tep_id, loaded._cutover_by_old[old_tep_id])
+        return index
+
+    def _old_tep_ids(self, tep_id: str) -> Set[str]:
+        """All tep ids renamed to tep_id, directly or through intermediate renames."""
+        old_tep_ids = set()
+        pending = [tep_id]
+        while pending:
+            for old_tep_id in self._old_by_new.get(pending.pop(), ()):
+                if old_tep_id not in old_tep_ids and old_tep_id != tep_id:
+                    old_tep_ids.add(old_tep_id)
+                    pending.append(old_tep_id)
+        return old_tep_ids
+
+    def _rename_path(self, old_tep_id: str) -> List[str]:
+        """Tep ids from old_tep_id to its final tep id, e.g. [A, B, C], cut before a cycle."""
+        path = [old_tep_id]
+        while path[-1] in self._new_by_old and self._new_by_old[path[-1]] not in path:
+            path.append(self._new_by_old[path[-1]])
+        return path
+
+    def expand(self, tep_ids):
+        """Returns the tep ids with the old tep ids of every renamed tep id added, same collection type."""
+        if not self._old_by_new:
+            return tep_ids
+        old_tep_ids = set()
+        for tep_id in tep_ids:
+            old_tep_ids.update(self._old_tep_ids(tep_id))
+        if not old_tep_ids:
+            return tep_ids
+        if isinstance(tep_ids, set):
+            return tep_ids | old_tep_ids
+        return list(tep_ids) + [tep_id for tep_id in old_tep_ids if tep_id not in tep_ids]
+
+    def stitch(self, items: List[Any]) -> List[Any]:
+        """Relabels and trims the old tep id points of the given item values, see class docstring."""
+        if not self._new_by_old:
+            return items
+        old_items = [item for item in items if getattr(item, ITEM_TEP_ID_ATTR) in self._new_by_old]
+        if not old_items:
+            return items
+
+        first_new_time: Dict[str, datetime] = {}
+        for item in items:
+            tep_id = getattr(item, ITEM_TEP_ID_ATTR)
+            if tep_id in self._old_by_new:
+                timestamp = getattr(item, ITEM_TIME_ATTR)
+                if tep_id not in first_new_time or timestamp < first_new_time[tep_id]:
+                    first_new_time[tep_id] = timestamp
+
+        paths: Dict[str, List[str]] = {}
+        result = [item for item in items if getattr(item, ITEM_TEP_ID_ATTR) not in self._new_by_old]
+        for item in old_items:
+            old_tep_id = getattr(item, ITEM_TEP_ID_ATTR)
+            path = paths.get(old_tep_id)
+            if path is None:
+                path = paths[old_tep_id] = self._rename_path(old_tep_id)
+            timestamp = getattr(item, ITEM_TIME_ATTR)
+            # the point must be before the cutover of every rename on the way to the final tep id
+            cutovers = [_as_comparable(cutover, timestamp)
+                        for step_old, step_new in zip(path, path[1:])
+                        for cutover in (self._cutover_by_old[step_old], first_new_time.get(step_new))
+                        if cutover is not None]
+            if cutovers and timestamp >= min(cutovers):
+                continue
+            stitched = copy.copy(item)
+            setattr(stitched, ITEM_TEP_ID_ATTR, path[-1])
+            result.append(stitched)
+
+        result.sort(key=lambda i: (getattr(i, ITEM_TEP_ID_ATTR), getattr(i, ITEM_TIME_ATTR)))
+        return result
@@ -0,0 +1,196 @@
+import argparse
+import os
+import sqlite3
+import time
+from urllib.parse import urlparse
+
+from utils import get_metadata_for_tags, iter_scada_signals
+
+SNAPSHOT_FIELDS = "name tepId metadata { _provenanceRecordAuditRecordCreatedTimestamp }"
+SNAPSHOT_DIR = "./.cache"
+SNAPSHOT_MAX_AGE_SECONDS = 3600
+# below this many distinct tags one query per tag is cheaper than paging through all signals
+SNAPSHOT_MIN_TAGS = 1000
+TAG_LOOKUP_MODES = ('auto', 'snapshot', 'per_tag')
+
+
+def add_snapshot_arguments(parser):
+    """Add the --tag-lookup and --refresh-snapshot switches to an entry point's argument parser."""
+    parser.add_argument("--tag-lookup", default="auto", choices=TAG_LOOKUP_MODES,
+                        help=f"Resolve tags with per tag queries, a local snapshot join, or auto (snapshot from "
+                             f"{SNAPSHOT_MIN_TAGS} tags)")
+    parser.add_argument("--refresh-snapshot", action="store_true",
+                        help="Re-export the snapshot before resolving, whatever its age")
+    return parser
+
+
+def default_snapshot_path(graphql_endpoint):
+    """One snapshot file per Dgraph environment, e.g. ./.cache/scada_signals_doggerbankprod.aurora.equinor.com.sqlite"""
+    return os.path.join(SNAPSHOT_DIR, f"scada_signals_{urlparse(graphql_endpoint).hostname}.sqlite")
+
+
+def export_snapshot(graphql_endpoint, scope, snapshot_path=None, page_size=10000):
+    """
+    Page through all ScadaSignal records (name, tepId, created timestamp) into a SQLite file indexed by name.
+
+    The snapshot is written to a temporary file and moved in place once complete, so a failed export never
+    leaves a partial snapshot behind.
+
+    Returns:
+    - str: Path of the snapshot.
+    """
+    snapshot_path = snapshot_path or default_snapshot_path(graphql_endpoint)
+    os.makedirs(os.path.dirname(snapshot_path) or ".", exist_ok=True)
+    tmp_path = f"{snapshot_path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    start = time.perf_counter()
+    connection = sqlite3.connect(tmp_path)
+    try:
+        connection.execute("CREATE TABLE signals (name TEXT NOT NULL, tep_id TEXT, created TEXT)")
+        connection.execute("CREATE TABLE snapshot_info (graphql_endpoint TEXT, exported_at REAL, records INTEGER)")
+        rows = []
+        count = 0
+        for record in iter_scada_signals(graphql_endpoint, scope, fields=SNAPSHOT_FIELDS, page_size=page_size):
+            metadata = record.get('metadata') or {}
+            rows.append((record['name'], record.get('tepId'),
+                         metadata.get('_provenanceRecordAuditRecordCreatedTimestamp')))
+            if len(rows) >= page_size:
+                connection.executemany("INSERT INTO signals VALUES (?, ?, ?)", rows)
+                count += len(rows)
+                rows = []
+                print(f"{count} signals exported")
+        connection.executemany("INSERT INTO signals VALUES (?, ?, ?)", rows)
+        count += len(rows)
+        connection.execute("CREATE INDEX signals_name ON signals (name)")
+        connection.execute("INSERT INTO snapshot_info VALUES (?, ?, ?)", (graphql_endpoint, time.time(), count))
+        connection.commit()
+    finally:
+        connection.close()
+    os.replace(tmp_path, snapshot_path)
+    print(f"Snapshot of {count} signals saved to '{snapshot_path}' in {time.perf_counter() - start:.1f}s")
+    return snapshot_path
+
+
+def snapshot_age_seconds(snapshot_path):
+    """Seconds since the snapshot was exported, None when there is no (complete) snapshot."""
+    if not os.path.exists(snapshot_path):
+        return None
+    connection = sqlite3.connect(snapshot_path)
+    try:
+        row = connection.execute("SELECT exported_at FROM snapshot_info").fetchone()
+    except sqlite3.DatabaseError:
+        return None
+    finally:
+        connection.close()
+    return time.time() - row[0] if row else None
+
+
+class ScadaSignalSnapshot:
+    """
+    In-memory hash of a snapshot, name -> records, for resolving tags by a local join instead of one
+    Dgraph query per tag.
+    """
+
+    def __init__(self, records_by_name):
+        self.records_by_name = records_by_name
+
+    @classmethod
+    def load(cls, snapshot_path, names=None):
+        """Load the records of the snapshot, only those of the given names when names is set."""
+        connection = sqlite3.connect(snapshot_path)
+        try:
+            if names is None:
+                rows = connection.execute("SELECT name, tep_id, created FROM signals").fetchall()
+            else:
+                connection.execute("CREATE TEMP TABLE wanted (name TEXT PRIMARY KEY)")
+                connection.executemany("INSERT OR IGNORE INTO wanted VALUES (?)", ((name,) for name in names))
+                rows = connection.execute("SELECT s.name, s.tep_id, s.created FROM signals s "
+                                          "JOIN wanted w ON s.name = w.name").fetchall()
+        finally:
+            connection.close()
+
+        records_by_name = {}
+        for name, tep_id, created in rows:
+            records_by_name.setdefault(name, []).append(
+                {'tepId': tep_id, 'metadata': {'_provenanceRecordAuditRecordCreatedTimestamp': created}
+                 if created is not None else None})
+        return cls(records_by_name)
+
+    def add_missing(self, names, lookup_many):
+        """
+        Resolve the names the snapshot does not have (e.g. created since the export) with a single lookup_many
+        call, so they are not reported as unknown.
+
+        Parameters:
+        - lookup_many (callable): list of names -> dict of name -> records, e.g. utils.get_metadata_for_tags.
+
+        Returns:
+        - list: The names that were missing from the snapshot.
+        """
+        missing = [name for name in names if name not in self.records_by_name]
+        if missing:
+            for name, records in lookup_many(missing).items():
+                if records:
+                    self.records_by_name[name] = records
+        return missing
+
+    def get_metadata_for_tag(self, tag):
+        """Same records as utils.get_metadata_for_tag, an empty list for unknown tags."""
+        return self.records_by_name.get(tag, [])
+
+    def tep_ids(self):
+        """name -> first non-null tepId, as picked by fetch_and_update_tepid."""
+        tep_ids = {}
+        for name, records in self.records_by_name.items():
+            tep_id = next((record['tepId'] for record in records if record['tepId'] is not None), None)
+            if tep_id is not None:
+                tep_ids[name] = tep_id
+        return tep_ids
+
+
+def get_signal_snapshot(graphql_endpoint, scope, tags, mode="auto", snapshot_path=None,
+                        max_age_seconds=SNAPSHOT_MAX_AGE_SECONDS):
+    """
+    Pick between a local snapshot join and per tag queries for resolving the given tags.
+
+    Parameters:
+    - tags (iterable): Tags to resolve.
+    - mode (str): 'snapshot', 'per_tag' or 'auto' (snapshot from SNAPSHOT_MIN_TAGS distinct tags).
+
+    Returns:
+    - ScadaSignalSnapshot: Records of the tags, re-exported when older than max_age_seconds, or None for
+      per tag queries. Tags missing from the snapshot are queried in batches.
+    """
+    names = {tag for tag in tags if isinstance(tag, str)}
+    if mode == "per_tag" or (mode == "auto" and len(names) < SNAPSHOT_MIN_TAGS):
+        return None
+
+    snapshot_path = snapshot_path or default_snapshot_path(graphql_endpoint)
+    age = snapshot_age_seconds(snapshot_path)
+    if age is None or age > max_age_seconds:
+        export_snapshot(graphql_endpoint, scope, snapshot_path)
+    else:
+        print(f"Using snapshot '{snapshot_path}' exported {age:.0f}s ago")
+    snapshot = ScadaSignalSnapshot.load(snapshot_path, names)
+    missing = snapshot.add_missing(names, lambda tags: get_metadata_for_tags(graphql_endpoint, scope, tags))
+    if missing:
+        print(f"{len(missing)} tags not in the snapshot were queried in batches")
+    return snapshot
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export all ScadaSignal names, tep ids and created timestamps "
+                                                 "of a Dgraph environment to a local SQLite snapshot.")
+    parser.add_argument("--graphql-endpoint", required=True)
+    parser.add_argument("--scope", required=True)
+    parser.add_argument("--snapshot-path", default=None)
+    parser.add_argument("--page-size", type=int, default=10000)
+    args = parser.parse_args()
+
+    export_snapshot(args.graphql_endpoint, args.scope, args.snapshot_path, args.page_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+import argparse
+import heapq
+import time
+from array import array
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+from utils import iter_scada_signals
+
+
+def name_ngrams(name, n=3):
+    """Case-folded character n-grams of a name, padded so the first and last characters get their own grams."""
+    padded = f" {name.casefold()} "
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+class TagNameMatcher:
+    """
+    Suggest known Dgraph signal names for tags that were not found.
+
+    Two indexes are built once over the known names: a case-folded exact map (HVDCGISCellar / HVDCGIScellar
+    is a direct hit) and an inverted index of character n-grams to name ids. Most tags share n-grams like
+    '.st' or 'val', which say nothing and would make every lookup touch every name, so n-grams found in more
+    than max_df of the names are left out of the candidate search. A query counts its informative n-grams per
+    name over their postings, and only the best max_candidates names are ranked by Dice similarity of their
+    full n-gram sets, so a lookup stays well under a millisecond instead of scanning all names.
+    """
+
+    def __init__(self, names, n=3, max_df=0.05, max_candidates=10):
+        self.n = n
+        self.max_candidates = max_candidates
+        self.names = list(dict.fromkeys(name for name in names if isinstance(name, str) and name))
+        self.max_postings = max(1, int(max_df * len(self.names)))
+
+        exact = defaultdict(list)
+        postings = defaultdict(lambda: array('I'))
+        for i, name in enumerate(self.names):
+            exact[name.casefold()].append(i)
+            for gram in name_ngrams(name, n):
+                postings[gram].append(i)
+        self._exact = dict(exact)
+        self._postings = {gram: np.frombuffer(ids, dtype=np.uint32) for gram, ids in postings.items()}
+
+    @classmethod
+    def from_dgraph(cls, graphql_endpoint, scope, **kwargs):
+        names = [record['name'] for record in iter_scada_signals(graphql_endpoint, scope, fields="name")]
+        print(f"Indexed {len(names)} signal names from Dgraph")
+        return cls(names, **kwargs)
+
+    def suggest(self, tag, limit=5, min_score=0.5):
+        """
+        Ranked candidate names for a tag.
+
+        Returns:
+        - list of tuples: (name, score) with score 1.0 for case-insensitive exact matches, else the Dice
+          similarity of the n-gram sets, best first.
+        """
+        if not isinstance(tag, str) or not tag:
+            return []
+        exact_ids = self._exact.get(tag.casefold(), [])
+        exact = [(self.names[i], 1.0) for i in exact_ids]
+        if len(exact) >= limit:
+            return exact[:limit]
+
+        grams = name_ngrams(tag, self.n)
+        known = [self._postings[gram] for gram in grams if gram in self._postings]
+        informative = [ids for ids in known if len(ids) <= self.max_postings]
+        if not informative:
+            # only common n-grams (short or generic tag), fall back to the rarest ones
+            informative = sorted(known, key=len)[:4]
+        if not informative:
+            return exact
+
+        # counts over the posted ids only, a lookup costs its postings and not the number of names
+        candidates, shared = np.unique(np.concatenate(informative), return_counts=True)
+        if len(candidates) > self.max_candidates:
+            candidates = candidates[np.argpartition(shared, -self.max_candidates)[-self.max_candidates:]]
+
+        scored = []
+        for i in candidates.tolist():
+            if i in exact_ids:
+                continue
+            candidate_grams = name_ngrams(self.names[i], self.n)
+            score = 2 * len(grams & candidate_grams) / (len(grams) + len(candidate_grams))
+            if score >= min_score:
+                scored.append((self.names[i], score))
+        return exact + heapq.nlargest(limit - len(exact), scored, key=lambda item: item[1])
+
+
+def suggest_unresolved(df, matcher, column_mappings, limit=5, min_score=0.5):
+    """
+    Add a '<tag column> suggestions' column with ranked candidates for every tag whose tep id was not resolved.
+
+    Parameters:
+    - df (pd.DataFrame): Output of fetch_and_update_tepid.
+    - matcher (TagNameMatcher): Index over the known signal names.
+    - column_mappings (list of tuples): Same (tag column, tep id column) pairs as fetch_and_update_tepid.
+
+    Returns:
+    - pd.DataFrame: df with one suggestion column per mapping, 'name (score)' joined by ' | '.
+    - float: Average milliseconds per lookup.
+    """
+    lookups = 0
+    start = time.perf_counter()
+    for source_column, tep_id_column in column_mappings:
+        suggestions = []
+        for tag, tep_id in zip(df[source_column], df[tep_id_column]):
+            if pd.isna(tep_id):
+                lookups += 1
+                suggestions.append(" | ".join(f"{name} ({score:.2f})"
+                                              for name, score in matcher.suggest(tag, limit, min_score)))
+            else:
+                suggestions.append(None)
+        df[f"{source_column} suggestions"] = suggestions
+    avg_ms = (time.perf_counter() - start) * 1000 / lookups if lookups else 0.0
+    return df, avg_ms
+
+
+def write_suggestions(df, graphql_endpoint, scope, column_mappings, output, limit=5, min_score=0.5):
+    """
+    Save ranked name suggestions for the rows of df with an unresolved tep id, if there are any.
+
+    Parameters:
+    - df (pd.DataFrame): Output of fetch_and_update_tepid.
+    - column_mappings (list of tuples): Same (tag column, tep id column) pairs as fetch_and_update_tepid.
+    - output (str): CSV file of the unresolved rows with their suggestion columns.
+
+    Returns:
+    - pd.DataFrame: The unresolved rows with their suggestions.
+    """
+    tep_id_columns = [tep_id_column for _, tep_id_column in column_mappings]
+    unresolved = df[df[tep_id_columns].isna().any(axis=1)].copy()
+    print(f"{len(unresolved)} of {len(df)} rows have an unresolved tag")
+    if unresolved.empty:
+        return unresolved
+
+    matcher = TagNameMatcher.from_dgraph(graphql_endpoint, scope)
+    unresolved, avg_ms = suggest_unresolved(unresolved, matcher, column_mappings, limit, min_score)
+    unresolved.to_csv(output, index=False)
+    print(f"Suggestions saved to '{output}' ({avg_ms:.3f} ms per lookup)")
+    return unresolved
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Suggest Dgraph signal names for tags without a resolved tep id.")
+    parser.add_argument("--csv-path", required=True, help="Resolved file, e.g. ./prod/right/tagname_tepid_final.csv")
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--graphql-endpoint", required=True)
+    parser.add_argument("--scope", required=True)
+    parser.add_argument("--old-col-name", default="Dgraph Name")
+    parser.add_argument("--new-col-name", default="New Name")
+    parser.add_argument("--limit", type=int, default=5)
+    parser.add_argument("--min-score", type=float, default=0.5)
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.csv_path)
+    column_mappings = [(args.old_col_name, 'old tep_id'), (args.new_col_name, 'new tep_id')]
+    output = args.output or args.csv_path.replace(".csv", "_suggestions.csv")
+    write_suggestions(df, args.graphql_endpoint, args.scope, column_mappings, output, args.limit, args.min_score)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import argparse
+import hashlib
+import os
+import sys
+import time
+
+import pandas as pd
+
+from redis_tag_updater import DEFAULT_HASH_NAME, get_redis_client
+from utils import iter_scada_signals
+
+
+def _digest(value):
+    """64-bit blake2b digest, the expected pairs are held as int -> int instead of strings."""
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def read_expected_pairs(csv_path, tag_col_name, tep_id_col_name, separator=","):
+    """Read the (new tag, expected tep_id) pairs of a resolved change file, rows without tep_id are skipped."""
+    df = pd.read_csv(csv_path, sep=separator, usecols=[tag_col_name, tep_id_col_name], dtype=str)
+    df = df.dropna(subset=[tag_col_name, tep_id_col_name])
+    return list(zip(df[tag_col_name].str.strip(), df[tep_id_col_name].str.strip()))
+
+
+def verify_pairs(expected_pairs, records):
+    """
+    Stream (tag, tep_id) records and check every expected pair against them.
+
+    Memory is bounded by the size of the change file: the lookup set holds 64-bit digests of the expected
+    pairs and the streamed records are never stored, only their mismatches.
+
+    Returns:
+    - dict: Number of expected pairs, scanned records, matching, mismatching and missing tags.
+    - list of tuples: (tag, expected tep_id, actual tep_id, status) for every mismatching or missing tag.
+    """
+    expected = {_digest(tag): _digest(tep_id) for tag, tep_id in expected_pairs}
+    seen = set()
+    mismatched = {}
+    scanned = 0
+    for tag, tep_id in records:
+        scanned += 1
+        if tag is None:
+            # e.g. a Dgraph record without a name, it cannot be one of the expected tags
+            continue
+        tag_digest = _digest(tag)
+        expected_digest = expected.get(tag_digest)
+        if expected_digest is None:
+            continue
+        seen.add(tag_digest)
+        if tep_id is None or _digest(tep_id) != expected_digest:
+            mismatched[tag] = tep_id
+
+    report = []
+    for tag, tep_id in expected_pairs:
+        if tag in mismatched:
+            report.append((tag, tep_id, mismatched.pop(tag), 'mismatch'))
+        elif _digest(tag) not in seen:
+            report.append((tag, tep_id, None, 'missing'))
+
+    mismatches = sum(1 for row in report if row[3] == 'mismatch')
+    stats = {
+        'expected': len(expected),
+        'scanned': scanned,
+        'matching': len(seen) - mismatches,
+        'mismatch': mismatches,
+        'missing': len(report) - mismatches,
+    }
+    return stats, report
+
+
+def iter_redis_pairs(client, hash_name=DEFAULT_HASH_NAME, scan_count=10000):
+    """Stream the tag -> tep_id hash with HSCAN."""
+    yield from client.hscan_iter(hash_name, count=scan_count)
+
+
+def iter_dgraph_pairs(graphql_endpoint, scope, page_size=10000):
+    """Stream the name -> tepId pairs of all ScadaSignal records."""
+    for record in iter_scada_signals(graphql_endpoint, scope, fields="name tepId", page_size=page_size):
+        yield record.get('name'), record.get('tepId')
+
+
+def store_verification_report(report, output_file):
+    df = pd.DataFrame(report, columns=['tag', 'expected tep_id', 'actual tep_id', 'status'])
+    df.to_csv(output_file, index=False)
+    print(f"Verification report with {len(df)} rows saved to '{output_file}'")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify every new tag -> tep_id pair of a resolved change file "
+                                                 "against Redis (HSCAN) or Dgraph (paginated queries).")
+    parser.add_argument("process_type", choices=["redis", "dgraph"])
+    parser.add_argument("--csv-path", required=True)
+    parser.add_argument("--tag-col-name", default="NewTagName")
+    parser.add_argument("--tep-id-col-name", default="old tep_id")
+    parser.add_argument("--separator", default=",")
+    parser.add_argument("--hash-name", default=os.environ.get("APP__REDIS__HASH_NAME", DEFAULT_HASH_NAME))
+    parser.add_argument("--scan-count", type=int, default=10000)
+    parser.add_argument("--graphql-endpoint")
+    parser.add_argument("--scope")
+    parser.add_argument("--page-size", type=int, default=10000)
+    parser.add_argument("--report", default="verification_report.csv")
+    args = parser.parse_args()
+
+    expected_pairs = read_expected_pairs(args.csv_path, args.tag_col_name, args.tep_id_col_name, args.separator)
+    if args.process_type == "redis":
+        records = iter_redis_pairs(get_redis_client(), args.hash_name, args.scan_count)
+    else:
+        records = iter_dgraph_pairs(args.graphql_endpoint, args.scope, args.page_size)
+
+    start = time.perf_counter()
+    stats, report = verify_pairs(expected_pairs, records)
+    print(f"{args.process_type}: verified in {time.perf_counter() - start:.2f}s: {stats}")
+
+    if report:
+        store_verification_report(report, args.report)
+        print(f"{args.process_type}: Verification failed")
+        sys.exit(1)
+    print(f"{args.process_type}: all {stats['expected']} tags verified")
+
+
+if __name__ == "__main__":
+    main()
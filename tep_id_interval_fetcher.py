@@ -1,4 +1,4 @@
-import pandas as pd
+from ingest import read_source
 from utils import count_datetime_occurrences, fetch_timestamps, fetch_and_update_tepid
 
 
@@ -6,7 +6,7 @@ from utils import count_datetime_occurrences, fetch_timestamps, fetch_and_update
 graphql_endpoint = "https://doggerbankdev.dev.aurora.equinor.com/storm/meta"
 
 csv_file = "./data2/raw-cleaned.csv"
-df = pd.read_csv(csv_file)
+df = read_source(csv_file)
 
 # Call the function to fetch timestamps and update tep ids based on multiple columns
 column_mappings_time = [
@@ -0,0 +1,68 @@
+import importlib
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCADA_UTILS_DIR = os.path.join(ROOT, "scada-utils", "utils")
+sys.path.insert(0, ROOT)
+# SCADA API helpers without relative imports are imported as top-level modules
+sys.path.insert(0, SCADA_UTILS_DIR)
+
+
+def import_scada_helper(name):
+    """Import a SCADA API helper that uses relative imports, as a module of a scada_utils package."""
+    if "scada_utils" not in sys.modules:
+        package = importlib.util.module_from_spec(importlib.machinery.ModuleSpec("scada_utils", None,
+                                                                                 is_package=True))
+        package.__path__ = [SCADA_UTILS_DIR]
+        sys.modules["scada_utils"] = package
+    return importlib.import_module(f"scada_utils.{name}")
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture(scope="session")
+def redis_server():
+    """
+    A throwaway local redis-server, or an in-memory fakeredis server when none is installed. The tests using
+    it are skipped when neither is available.
+    """
+    redis = pytest.importorskip("redis")
+    binary = shutil.which("redis-server")
+    if binary is None:
+        fakeredis = pytest.importorskip("fakeredis", reason="neither redis-server nor fakeredis is installed")
+        yield fakeredis.FakeRedis(decode_responses=True)
+        return
+
+    port = _free_port()
+    process = subprocess.Popen([binary, "--port", str(port), "--save", "", "--appendonly", "no"],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    client = redis.Redis(port=port, decode_responses=True)
+    for _ in range(50):
+        try:
+            client.ping()
+            break
+        except redis.ConnectionError:
+            time.sleep(0.1)
+    else:
+        process.kill()
+        pytest.skip("redis-server did not start")
+    yield client
+    process.terminate()
+    process.wait()
+
+
+@pytest.fixture
+def redis_client(redis_server):
+    redis_server.flushall()
+    return redis_server
@@ -0,0 +1,162 @@
+import csv
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from dgraph_tag_renamer import DgraphTagRenamer
+
+JSON_STRING = r'"(?:[^"\\]|\\.)*"'
+UPDATE_PATTERN = re.compile(rf'(r\d+): updateScadaSignal\(input: {{filter: {{name: {{eq: ({JSON_STRING})}}}}, '
+                            rf'set: {{name: ({JSON_STRING})}}}}\)')
+NAMES_PATTERN = re.compile(r'name: { in: (\[.*?\]) }')
+
+
+class GraphQLStandIn:
+    """
+    Local stand-in for the Dgraph GraphQL endpoint: ScadaSignal names in memory, aliased updateScadaSignal
+    mutations and queryScadaSignal by names. Old names in abort_once get an aborted transaction the first time,
+    a batch with an old name in fail_after_apply is applied and then answered with a 503.
+    """
+
+    def __init__(self, names):
+        self.names = list(names)
+        self.abort_once = set()
+        self.fail_after_apply = set()
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def handle(self, query):
+        with self._lock:
+            self.requests += 1
+            names_match = NAMES_PATTERN.search(query)
+            if names_match:
+                wanted = set(json.loads(names_match.group(1)))
+                return 200, {'data': {'queryScadaSignal': [{'name': name} for name in self.names
+                                                           if name in wanted]}}
+            data, errors = {}, []
+            fail = False
+            for alias, old_name, new_name in UPDATE_PATTERN.findall(query):
+                old_name, new_name = json.loads(old_name), json.loads(new_name)
+                if old_name in self.abort_once:
+                    self.abort_once.discard(old_name)
+                    data[alias] = None
+                    errors.append({'message': "Transaction has been aborted. Please retry", 'path': [alias]})
+                    continue
+                num_uids = 0
+                for i, name in enumerate(self.names):
+                    if name == old_name:
+                        self.names[i] = new_name
+                        num_uids += 1
+                data[alias] = {'numUids': num_uids}
+                if old_name in self.fail_after_apply:
+                    self.fail_after_apply.discard(old_name)
+                    fail = True
+            if fail:
+                return 503, {'errors': [{'message': "upstream connect error"}]}
+            return 200, {'data': data, 'errors': errors} if errors else {'data': data}
+
+
+@pytest.fixture
+def graphql_server():
+    servers = []
+
+    def start(names):
+        stand_in = GraphQLStandIn(names)
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                status, payload = stand_in.handle(body['query'])
+                encoded = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(encoded)))
+                self.end_headers()
+                self.wfile.write(encoded)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return stand_in, f"http://127.0.0.1:{server.server_address[1]}/graphql"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def make_renamer(endpoint, tmp_path, **kwargs):
+    renamer = DgraphTagRenamer(endpoint, "scope", rollback_file=str(tmp_path / "rollback.csv"), retry_delay=0,
+                               timeout=(1, 5), **kwargs)
+    # no token provider here
+    renamer._access_token = "token"
+    return renamer
+
+
+def read_rollback(tmp_path):
+    with open(tmp_path / "rollback.csv", newline='') as file:
+        return list(csv.reader(file))[1:]
+
+
+def test_throughput(graphql_server, tmp_path):
+    names = [f"WF.T{i:05d}.Signal" for i in range(5000)]
+    stand_in, endpoint = graphql_server(names)
+    changes = [(name, f"{name}.v2") for name in names]
+
+    stats, failures = make_renamer(endpoint, tmp_path, batch_size=100, concurrency=4).rename(changes)
+
+    print(f"\n{len(changes)} renames in {stats['batches']} batches: {stats['elapsed_seconds']:.2f}s, "
+          f"{stats['renames_per_second']:.0f} renames/s")
+    assert failures == [] and stats['renamed'] == len(changes)
+    assert stand_in.names == [new for _, new in changes]
+    assert len(read_rollback(tmp_path)) == len(changes)
+
+
+def test_aborted_aliases_are_retried_alone(graphql_server, tmp_path):
+    stand_in, endpoint = graphql_server(['A', 'B', 'C'])
+    stand_in.abort_once = {'B'}
+
+    stats, failures = make_renamer(endpoint, tmp_path).rename([('A', 'A2'), ('B', 'B2'), ('C', 'C2')])
+
+    assert failures == [] and stats['renamed'] == 3
+    assert stand_in.names == ['A2', 'B2', 'C2']
+    assert stand_in.requests == 2
+
+
+def test_renames_applied_by_a_failed_request_are_kept_for_rollback(graphql_server, tmp_path):
+    stand_in, endpoint = graphql_server(['A', 'B', 'C'])
+    stand_in.abort_once = {'C'}
+    stand_in.fail_after_apply = {'A'}
+
+    stats, failures = make_renamer(endpoint, tmp_path).rename([('A', 'A2'), ('B', 'B2'), ('C', 'C2')])
+
+    assert failures == [] and stats['renamed'] == 3
+    assert stand_in.names == ['A2', 'B2', 'C2']
+    assert sorted(read_rollback(tmp_path)) == [['A2', 'A'], ['B2', 'B'], ['C2', 'C']]
+
+
+def test_duplicate_new_names_are_not_renamed(graphql_server, tmp_path):
+    stand_in, endpoint = graphql_server(['A', 'B', 'D'])
+
+    stats, failures = make_renamer(endpoint, tmp_path).rename([('A', 'X'), ('B', 'B2'), ('D', 'X')])
+
+    assert stand_in.names == ['A', 'B2', 'D']
+    assert stats['renamed'] == 1 and stats['duplicate_new'] == 2
+    assert sorted(failures) == [('A', 'X', 'duplicate_new'), ('D', 'X', 'duplicate_new')]
+
+
+def test_renames_into_a_failed_link_are_not_run(graphql_server, tmp_path):
+    # B is not in Dgraph, B -> C ends as not_found, A -> B must not run afterwards
+    stand_in, endpoint = graphql_server(['A', 'E'])
+
+    stats, failures = make_renamer(endpoint, tmp_path, batch_size=1).rename([('A', 'B'), ('B', 'C'), ('E', 'A')])
+
+    assert stand_in.names == ['A', 'E']
+    assert sorted(failures) == [('A', 'B', 'chain_blocked'), ('B', 'C', 'not_found'), ('E', 'A', 'chain_blocked')]
+    assert read_rollback(tmp_path) == []
@@ -0,0 +1,31 @@
+import pytest
+
+from preflight_plan import blocking_issues, build_plan, load_plan, store_plan
+
+
+def _plan(tag_changes, values):
+    diffs = [(old, new, values.get(old), values.get(new)) for old, new in tag_changes]
+    return build_plan(tag_changes, None, diffs, 0.001, 1000, "SCADA_TEPID")
+
+
+def test_chained_renames_are_ordered_ops():
+    plan = _plan([('A', 'B'), ('B', 'C')], {'A': 'tA', 'B': 'tB'})
+
+    assert plan['ops'] == [['B', 'C', 'tB'], ['A', 'B', 'tA']]
+    assert blocking_issues(plan) == {}
+
+
+@pytest.mark.parametrize("tag_changes, values, issue", [
+    ([('A', 'X'), ('B', 'X')], {'A': 'tA', 'B': 'tB'}, 'duplicate_new'),
+    ([('A', 'X'), ('A', 'Y')], {'A': 'tA'}, 'duplicate_old'),
+    ([('A', 'B'), ('B', 'A')], {'A': 'tA', 'B': 'tB'}, 'cycles'),
+    ([('A', 'X')], {'A': 'tA', 'X': 'tX'}, 'conflicts_in_redis'),
+])
+def test_plans_with_blocking_issues_are_refused(tmp_path, tag_changes, values, issue):
+    plan = _plan(tag_changes, values)
+    assert issue in blocking_issues(plan)
+
+    plan_file = tmp_path / "plan.json"
+    store_plan(plan, plan_file)
+    with pytest.raises(ValueError, match="blocking issues"):
+        load_plan(plan_file)
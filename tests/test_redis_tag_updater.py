@@ -0,0 +1,77 @@
+import pytest
+
+from redis_tag_updater import apply_plan, apply_tag_renames
+
+HASH_NAME = "SCADA_TEPID"
+
+
+def test_renames_are_written_and_idempotent(redis_client):
+    redis_client.hset(HASH_NAME, mapping={'A': 'tA', 'B': 'tB'})
+    changes = [('A', 'A2'), ('B', 'B2'), ('missing', 'M2')]
+
+    stats, report = apply_tag_renames(redis_client, changes, HASH_NAME, batch_size=1)
+
+    assert redis_client.hgetall(HASH_NAME) == {'A': 'tA', 'B': 'tB', 'A2': 'tA', 'B2': 'tB'}
+    assert stats['renamed'] == 2 and stats['missing'] == 1
+    assert report == [('missing', 'M2', 'missing', None, None)]
+
+    stats, _ = apply_tag_renames(redis_client, changes, HASH_NAME, batch_size=1)
+    assert stats['renamed'] == 0 and stats['already_applied'] == 2
+
+
+def test_duplicate_new_tags_do_not_depend_on_batches(redis_client):
+    changes = [('A', 'X'), ('B', 'C'), ('D', 'X')]
+    for batch_size in (1, 2, 3):
+        redis_client.flushall()
+        redis_client.hset(HASH_NAME, mapping={'A': 'tA', 'B': 'tB', 'D': 'tD'})
+
+        stats, report = apply_tag_renames(redis_client, changes, HASH_NAME, batch_size=batch_size)
+
+        assert stats['renamed'] == 1 and stats['duplicate_new'] == 2
+        assert redis_client.hget(HASH_NAME, 'X') is None
+        assert sorted(row[:3] for row in report) == [('A', 'X', 'duplicate_new'), ('D', 'X', 'duplicate_new')]
+
+
+def test_chained_renames(redis_client):
+    for batch_size, overwrite, delete_old in [(1, True, False), (1, False, False), (2, False, True)]:
+        redis_client.flushall()
+        redis_client.hset(HASH_NAME, mapping={'A': 'tA', 'B': 'tB'})
+
+        stats, report = apply_tag_renames(redis_client, [('A', 'B'), ('B', 'C')], HASH_NAME,
+                                          batch_size=batch_size, overwrite=overwrite, delete_old=delete_old)
+
+        expected = {'B': 'tA', 'C': 'tB'} if delete_old else {'A': 'tA', 'B': 'tA', 'C': 'tB'}
+        assert redis_client.hgetall(HASH_NAME) == expected
+        assert stats['renamed'] == 2 and report == []
+
+
+@pytest.mark.parametrize("initial, refused", [({'A': 'tA', 'B': 'tB', 'C': 'tX'}, 'conflict'),
+                                              ({'A': 'tA'}, 'missing')])
+def test_renames_into_a_refused_link_are_blocked(redis_client, initial, refused):
+    redis_client.hset(HASH_NAME, mapping=initial)
+
+    stats, report = apply_tag_renames(redis_client, [('A', 'B'), ('B', 'C')], HASH_NAME, batch_size=1,
+                                      delete_old=True)
+
+    assert redis_client.hgetall(HASH_NAME) == initial
+    assert stats['renamed'] == 0 and stats['chain_blocked'] == 1
+    assert sorted(row[:3] for row in report) == [('A', 'B', 'chain_blocked'), ('B', 'C', refused)]
+
+
+def test_cycles_are_not_applied(redis_client):
+    redis_client.hset(HASH_NAME, mapping={'A': 'tA', 'B': 'tB'})
+
+    stats, report = apply_tag_renames(redis_client, [('A', 'B'), ('B', 'A')], HASH_NAME)
+
+    assert redis_client.hgetall(HASH_NAME) == {'A': 'tA', 'B': 'tB'}
+    assert stats['cycle'] == 2 and {row[2] for row in report} == {'cycle'}
+
+
+def test_apply_plan_keeps_chained_new_tags(redis_client):
+    redis_client.hset(HASH_NAME, mapping={'A': 'tA', 'B': 'tB'})
+    plan = {'hash_name': HASH_NAME, 'batch_size': 1, 'ops': [['B', 'C', 'tB'], ['A', 'B', 'tA']]}
+
+    stats = apply_plan(redis_client, plan, delete_old=True)
+
+    assert redis_client.hgetall(HASH_NAME) == {'B': 'tA', 'C': 'tB'}
+    assert stats['renamed'] == 2 and stats['deleted_old'] == 1
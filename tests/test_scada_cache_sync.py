@@ -0,0 +1,62 @@
+import threading
+
+import pytest
+
+pytest.importorskip("fastapi_jwt_auth")
+pytest.importorskip("app.core.logger")
+
+from scada_cache_sync import ScadaCacheSyncCoordinator  # noqa: E402
+
+
+class _Unauthorized(Exception):
+    status_code = 401
+
+
+def test_waiters_run_their_own_sync_after_an_auth_error_of_the_leader():
+    coordinator = ScadaCacheSyncCoordinator()
+    leader_started, release_leader = threading.Event(), threading.Event()
+    results = {}
+
+    def leader_sync():
+        leader_started.set()
+        release_leader.wait()
+        raise _Unauthorized()
+
+    def leader():
+        try:
+            coordinator.run("key", leader_sync)
+        except _Unauthorized:
+            results["leader"] = "unauthorized"
+
+    leader_thread = threading.Thread(target=leader)
+    leader_thread.start()
+    leader_started.wait()
+    waiter_thread = threading.Thread(target=lambda: results.setdefault("waiter", coordinator.run("key", lambda: "ok")))
+    waiter_thread.start()
+    release_leader.set()
+    leader_thread.join()
+    waiter_thread.join()
+
+    assert results == {"leader": "unauthorized", "waiter": "ok"}
+
+
+def test_stale_keys_are_refreshed_with_the_background_sync_only():
+    background_keys = []
+    coordinator = ScadaCacheSyncCoordinator(fresh_ttl=0, stale_ttl=60, background_sync=background_keys.append)
+    coordinator.run("key", lambda: None)
+
+    coordinator.run("key", lambda: pytest.fail("the caller's sync must not run in the background"))
+
+    for thread in threading.enumerate():
+        if thread.name.startswith("scada-cache-refresh-"):
+            thread.join()
+    assert background_keys == ["key"]
+
+
+def test_no_stale_window_without_a_background_sync():
+    calls = []
+    coordinator = ScadaCacheSyncCoordinator(fresh_ttl=0, stale_ttl=60)
+    coordinator.run("key", lambda: calls.append(1))
+    coordinator.run("key", lambda: calls.append(2))
+
+    assert calls == [1, 2]
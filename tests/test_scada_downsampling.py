@@ -0,0 +1,55 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from scada_downsampling import ScadaDownsampleMethod, downsample_item_values  # noqa: E402
+
+
+@dataclass
+class ItemValue:
+    tep_id: str
+    timestamp: datetime
+    min: Optional[float]
+    max: Optional[float]
+    avg: Optional[float]
+    last: Optional[float]
+
+
+def _series(n, tep_id="tep-1"):
+    start = datetime(2024, 2, 29)
+    return [ItemValue(tep_id, start + timedelta(minutes=10 * i), min=float(i % 7), max=float(10 + i % 5),
+                      avg=float(i), last=float(i) + 0.5) for i in range(n)]
+
+
+def test_min_and_max_select_on_their_aggregate():
+    items = _series(100)
+    lows = downsample_item_values(items, 10, ScadaDownsampleMethod.min)
+    highs = downsample_item_values(items, 10, ScadaDownsampleMethod.max)
+
+    assert len(lows) == len(highs) == 10
+    assert all(item.min == 0.0 for item in lows)
+    assert all(item.max == 14.0 for item in highs)
+
+
+def test_mean_averages_avg_and_keeps_last_of_bucket():
+    items = _series(100)
+    result = downsample_item_values(items, 10, ScadaDownsampleMethod.mean)
+
+    first = result[0]
+    assert first.avg == pytest.approx(4.5)
+    assert first.last == 9.5 and first.timestamp == items[9].timestamp
+    assert first.min == 0.0 and first.max == 14.0
+    # the original items are left untouched
+    assert items[9].avg == 9.0
+
+
+def test_series_are_downsampled_per_tep_id():
+    items = _series(50, "a") + _series(5, "b")
+    result = downsample_item_values(items, 10, ScadaDownsampleMethod.lttb)
+
+    assert sum(item.tep_id == "a" for item in result) == 10
+    assert sum(item.tep_id == "b" for item in result) == 5
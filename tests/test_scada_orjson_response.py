@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+import pytest
+
+pytest.importorskip("fastapi")
+pydantic = pytest.importorskip("pydantic")
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+import scada_orjson_response  # noqa: E402
+from scada_orjson_response import ORJSONScadaResponse  # noqa: E402
+
+PLAIN_FLOATS = [0.1, -3.25, 123456.125, 0.0, 1e15, 0.0001]
+EXPONENT_FLOATS = [1e-05, -2.5e-06, 1.5e-07, 1e16, 1.2345678901234568e+17]
+START = datetime(2024, 2, 29, tzinfo=timezone.utc)
+
+
+# shaped like the SCADA schemas: camelCase aliases, optional fields, nested lists of values
+class ItemValue(pydantic.BaseModel):
+    timestamp: datetime
+    min: Optional[float]
+    max: Optional[float]
+    avg: Optional[float]
+    last: Optional[float]
+
+
+class AggReferenceSignal(pydantic.BaseModel):
+    name: str
+    tep_id: str = pydantic.Field(alias="tepId")
+    scada_reference_signal_name: str = pydantic.Field(alias="scadaReferenceSignalName")
+    offshore_wind_turbine_id: Optional[str] = pydantic.Field(None, alias="offshoreWindTurbineId")
+    thresholds: List[float] = []
+    values: List[ItemValue]
+
+
+def build_payload(floats, n_signals=4, n_points=50):
+    payload = []
+    for s in range(n_signals):
+        values = [ItemValue(timestamp=START + timedelta(minutes=10 * p), min=floats[p % len(floats)],
+                            max=floats[(p + 1) % len(floats)], avg=None if p % 7 == 0 else p + 0.125,
+                            last=float(p))
+                  for p in range(n_points)]
+        payload.append(AggReferenceSignal(name=f"DBA.WTG{s:03d}.Rotor.Speed", tepId=f"tep-{s:08d}",
+                                          scadaReferenceSignalName="RotorSpeed",
+                                          offshoreWindTurbineId=None if s % 2 else f"WTG{s:03d}",
+                                          thresholds=floats[:3], values=values))
+    return payload
+
+
+@pytest.fixture(params=["fragment", "fallback"])
+def fragment_support(request, monkeypatch):
+    if request.param == "fragment" and scada_orjson_response._Fragment is None:
+        pytest.skip("orjson without Fragment")
+    if request.param == "fallback":
+        monkeypatch.setattr(scada_orjson_response, "_Fragment", None)
+    return request.param
+
+
+@pytest.mark.parametrize("floats", [PLAIN_FLOATS, PLAIN_FLOATS + EXPONENT_FLOATS], ids=["plain", "exponent"])
+def test_orjson_response_is_byte_identical_to_json_response(floats, fragment_support):
+    payload = build_payload(floats)
+
+    body = ORJSONScadaResponse(content=payload).body
+
+    assert body == JSONResponse(content=jsonable_encoder(payload)).body
+    assert ORJSONScadaResponse(content={"wf": payload}).body == \
+        JSONResponse(content=jsonable_encoder({"wf": payload})).body
+
+
+def test_placeholder_like_strings_fall_back_to_json_response(fragment_support):
+    payload = build_payload(PLAIN_FLOATS + EXPONENT_FLOATS, n_signals=1, n_points=3)
+    payload[0].name = "\x000\x00"
+
+    assert ORJSONScadaResponse(content=payload).body == JSONResponse(content=jsonable_encoder(payload)).body
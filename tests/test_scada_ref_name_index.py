@@ -0,0 +1,68 @@
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("app.api.api_v1.api_deps")
+
+import scada_ref_name_index  # noqa: E402
+from scada_ref_name_index import ScadaRefNameIndex  # noqa: E402
+
+KEY = ("WF1", frozenset(["RotorSpeed", "Power"]), False)
+OTHER_KEY = ("WF2", frozenset(["Power"]), True)
+
+
+class FakeRequest:
+    def __init__(self, headers):
+        self.headers = headers
+
+
+def test_snapshot_is_memory_mapped_back_with_the_tep_ids(tmp_path, monkeypatch):
+    monkeypatch.setattr(scada_ref_name_index, "get_asset_shortname", lambda request: "DBA")
+    monkeypatch.setattr(scada_ref_name_index, "get_measurement_std_ref_names",
+                        lambda asset_short_name, measurement_standard_name: ["RotorSpeed", "Power"])
+    tep_ids = {KEY: ["tep-2", "tep-1"], OTHER_KEY: ["tep-3"]}
+    snapshot_path = str(tmp_path / "ref_names.json")
+    index = ScadaRefNameIndex(snapshot_path, refresh_seconds=60, tep_ids_of=tep_ids.get)
+    index.get_ref_names(FakeRequest({"host": "a"}), "MSN-1")
+    index.record_sync(KEY)
+    index.record_sync(OTHER_KEY)
+    index.save_snapshot()
+
+    # the cache helper of a new pod is empty
+    reloaded = ScadaRefNameIndex(snapshot_path, refresh_seconds=60, tep_ids_of=lambda key: [])
+    assert reloaded.load_snapshot()
+
+    assert reloaded.get_tep_ids(KEY) == ["tep-1", "tep-2"]
+    assert reloaded.get_tep_ids(OTHER_KEY) == ["tep-3"]
+    assert list(reloaded._sync_keys) == [KEY, OTHER_KEY]
+    assert reloaded._ref_names == {("DBA", "MSN-1"): ["RotorSpeed", "Power"]}
+
+
+def test_warm_up_replays_the_syncs_and_updates_their_tep_ids(tmp_path, monkeypatch):
+    monkeypatch.setattr(scada_ref_name_index, "get_measurement_std_ref_names",
+                        lambda asset_short_name, measurement_standard_name: [])
+    snapshot_path = str(tmp_path / "ref_names.json")
+    index = ScadaRefNameIndex(snapshot_path, refresh_seconds=60, tep_ids_of={KEY: ["tep-1"]}.get)
+    index.record_sync(KEY)
+    index.save_snapshot()
+
+    replayed = []
+    reloaded = ScadaRefNameIndex(snapshot_path, refresh_seconds=60, tep_ids_of={KEY: ["tep-1b"]}.get)
+    reloaded.warm(replay_sync=replayed.append, max_syncs=10, timeout_seconds=60)
+
+    assert replayed == [KEY]
+    assert reloaded.get_tep_ids(KEY) == ["tep-1b"]
+
+
+def test_asset_short_names_are_not_cached_per_host(monkeypatch):
+    requests = []
+    monkeypatch.setattr(scada_ref_name_index, "get_asset_shortname",
+                        lambda request: requests.append(request) or request.headers["x-asset"])
+    monkeypatch.setattr(scada_ref_name_index, "get_measurement_std_ref_names",
+                        lambda asset_short_name, measurement_standard_name: [f"{asset_short_name}-ref"])
+    index = ScadaRefNameIndex(None, refresh_seconds=60)
+
+    first = index.get_ref_names(FakeRequest({"host": "api", "x-asset": "DBA"}), "MSN-1")
+    second = index.get_ref_names(FakeRequest({"host": "api", "x-asset": "DBB"}), "MSN-1")
+
+    assert (first, second) == (["DBA-ref"], ["DBB-ref"])
+    assert len(requests) == 2
@@ -0,0 +1,51 @@
+import os
+
+import pytest
+
+pytest.importorskip("fastapi_jwt_auth")
+
+from scada_service_identity import ScadaServiceIdentity, is_service_dependency, service_dependency  # noqa: E402
+
+
+def test_token_is_read_from_the_configured_file_and_re_read_when_it_changes(tmp_path):
+    token_file = tmp_path / "token"
+    token_file.write_text("token-1\n")
+    identity = ScadaServiceIdentity(str(token_file), flow_type="service")
+
+    assert identity.enabled and identity._access_token() == "token-1"
+    token_file.write_text("token-2\n")
+    os.utime(token_file, ns=(0, os.stat(token_file).st_mtime_ns + 1))
+    assert identity._access_token() == "token-2"
+    assert not ScadaServiceIdentity(None, flow_type="service").enabled
+
+
+def test_generator_providers_are_closed_after_the_sync():
+    events = []
+
+    def generator_provider():
+        events.append("open")
+        try:
+            yield "client"
+        finally:
+            events.append("close")
+
+    with service_dependency(generator_provider) as client:
+        events.append(client)
+    with service_dependency(lambda: "plain") as client:
+        events.append(client)
+
+    assert events == ["open", "client", "close", "plain"]
+
+
+def test_providers_with_sub_dependencies_are_refused():
+    def provider_with_sub_dependency(settings=object()):
+        return "client"
+
+    async def async_provider():
+        return "client"
+
+    assert not is_service_dependency(provider_with_sub_dependency)
+    assert not is_service_dependency(async_provider)
+    with pytest.raises(TypeError):
+        with service_dependency(provider_with_sub_dependency):
+            pass
@@ -0,0 +1,32 @@
+from scada_signal_names import get_tep_ids_by_sig_names
+
+
+class CacheHelperStandIn:
+    """Signal name -> (tbr id, tep id) per wind farm, ref name and is_agg, counting the lookups per name."""
+
+    def __init__(self, entries):
+        self.entries = entries
+        self.lookups = []
+
+    def get_tep_id_tbr_by_sig_name(self, wf_id, given_ref_name, sig_name, is_agg=False):
+        self.lookups.append(sig_name)
+        return self.entries.get((wf_id, given_ref_name, is_agg, sig_name))
+
+
+def test_bulk_lookup_skips_unresolved_names_and_duplicates():
+    helper = CacheHelperStandIn({
+        ("WF", "ref", False, "A"): ("T1", "tep-a"),
+        ("WF", "ref", False, "B"): ("T2", "tep-b"),
+        # two names of the same tep id
+        ("WF", "ref", False, "B2"): ("T2", "tep-b"),
+        ("WF", "ref", False, "empty"): ("T3", ""),
+        ("WF", "ref", True, "A"): ("T1", "tep-a-agg"),
+    })
+
+    tep_ids = get_tep_ids_by_sig_names(helper, wf_id="WF", given_ref_name="ref",
+                                       sig_names=["A", "missing", "B", "A", "B2", "empty"])
+
+    assert tep_ids == ["tep-a", "tep-b"]
+    assert helper.lookups == ["A", "missing", "B", "B2", "empty"]
+    assert get_tep_ids_by_sig_names(helper, wf_id="WF", given_ref_name="ref", sig_names=["A"],
+                                    is_agg=True) == ["tep-a-agg"]
@@ -0,0 +1,62 @@
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import utils
+from scada_signal_snapshot import ScadaSignalSnapshot
+
+NAMES_PATTERN = re.compile(r'name: { in: (\[.*?\]) }')
+
+
+def test_names_missing_from_the_snapshot_are_queried_in_one_batch_lookup():
+    snapshot = ScadaSignalSnapshot({'A': [{'tepId': 'tA', 'metadata': None}]})
+    queried = []
+
+    def lookup_many(tags):
+        queried.append(tags)
+        return {'B': [{'tepId': 'tB', 'metadata': None}]}
+
+    missing = snapshot.add_missing(['A', 'B', 'unknown'], lookup_many)
+
+    assert missing == ['B', 'unknown']
+    assert queried == [['B', 'unknown']]
+    assert snapshot.tep_ids() == {'A': 'tA', 'B': 'tB'}
+    assert snapshot.get_metadata_for_tag('unknown') == []
+
+
+def test_metadata_for_tags_is_queried_in_batches_with_one_token(monkeypatch):
+    signals = {f"T{i}": f"tep-{i}" for i in range(7)}
+    queries = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            query = json.loads(self.rfile.read(int(self.headers['Content-Length'])))['query']
+            queries.append(query)
+            wanted = json.loads(NAMES_PATTERN.search(query).group(1))
+            records = [{'name': name, 'tepId': signals[name], 'metadata': None} for name in wanted
+                       if name in signals]
+            encoded = json.dumps({'data': {'queryScadaSignal': records}}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(encoded)))
+            self.end_headers()
+            self.wfile.write(encoded)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    tokens = []
+    monkeypatch.setattr(utils, "get_access_token", lambda scope: tokens.append(scope) or "token")
+    try:
+        records_by_name = utils.get_metadata_for_tags(f"http://127.0.0.1:{server.server_address[1]}/graphql",
+                                                      "scope", [*signals, 'unknown', 'T0'], batch_size=3)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert tokens == ["scope"]
+    assert len(queries) == 3
+    assert records_by_name == {name: [{'tepId': tep_id, 'metadata': None}] for name, tep_id in signals.items()}
@@ -0,0 +1,68 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("app.core.logger")
+
+from conftest import import_scada_helper  # noqa: E402
+
+TepIdAliasIndex = import_scada_helper("scada_tep_id_alias_index").TepIdAliasIndex
+START = datetime(2024, 3, 1)
+
+
+@dataclass
+class ItemValue:
+    tep_id: str
+    timestamp: datetime
+    avg: float
+
+
+def points(tep_id, hours):
+    return [ItemValue(tep_id, START + timedelta(hours=hour), float(hour)) for hour in hours]
+
+
+def chained_index():
+    index = TepIdAliasIndex()
+    index.add("A", "B", START + timedelta(hours=10))
+    index.add("B", "C", START + timedelta(hours=20))
+    return index
+
+
+def test_expand_follows_chained_renames():
+    index = chained_index()
+
+    assert index.expand({"C"}) == {"A", "B", "C"}
+    assert index.expand(["B"]) == ["B", "A"]
+    assert index.expand({"X"}) == {"X"}
+
+
+def test_stitch_relabels_to_the_final_tep_id_with_every_cutover():
+    index = chained_index()
+    items = points("A", range(0, 25, 5)) + points("B", range(10, 25, 5)) + points("C", [20])
+
+    stitched = index.stitch(items)
+
+    assert {item.tep_id for item in stitched} == {"C"}
+    # A up to its cutover at 10h, B from 10h up to its cutover at 20h, then C
+    assert [(item.timestamp - START) / timedelta(hours=1) for item in stitched] == [0, 5, 10, 15, 20]
+    assert [item.avg for item in stitched] == [0, 5, 10, 15, 20]
+
+
+def test_stitch_stops_old_points_at_the_first_point_of_a_later_tep_id():
+    index = TepIdAliasIndex()
+    index.add("A", "B")
+    index.add("B", "C")
+
+    stitched = index.stitch(points("A", [0, 5, 10]) + points("C", [6]))
+
+    assert [(item.tep_id, item.avg) for item in stitched] == [("C", 0), ("C", 5), ("C", 6)]
+
+
+def test_unreadable_alias_files_are_skipped(tmp_path):
+    change_file = tmp_path / "changes.csv"
+    change_file.write_text("old tep_id,new tep_id,createdTimeNewTag\nA,B,2024-03-01 10:00:00\n")
+
+    index = TepIdAliasIndex.from_csv_files([str(tmp_path / "missing.csv"), str(change_file)])
+
+    assert len(index) == 1 and index.expand({"B"}) == {"A", "B"}
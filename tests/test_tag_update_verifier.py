@@ -0,0 +1,23 @@
+from tag_update_verifier import iter_redis_pairs, verify_pairs
+
+HASH_NAME = "SCADA_TEPID_TEST"
+
+
+def test_pairs_are_verified_against_an_hscan_of_the_hash(redis_client):
+    redis_client.hset(HASH_NAME, mapping={f"T{i}": f"tep-{i}" for i in range(50)})
+    redis_client.hset(HASH_NAME, 'T7', 'tep-old')
+    expected_pairs = [('T3', 'tep-3'), ('T7', 'tep-7'), ('T42', 'tep-42'), ('T99', 'tep-99')]
+
+    stats, report = verify_pairs(expected_pairs, iter_redis_pairs(redis_client, HASH_NAME, scan_count=7))
+
+    assert stats == {'expected': 4, 'scanned': 50, 'matching': 2, 'mismatch': 1, 'missing': 1}
+    assert report == [('T7', 'tep-7', 'tep-old', 'mismatch'), ('T99', 'tep-99', None, 'missing')]
+
+
+def test_records_without_a_name_are_skipped():
+    records = [(None, 'tep-x'), ('A', 'tep-a'), ('B', None)]
+
+    stats, report = verify_pairs([('A', 'tep-a'), ('B', 'tep-b')], records)
+
+    assert stats == {'expected': 2, 'scanned': 3, 'matching': 1, 'mismatch': 1, 'missing': 0}
+    assert report == [('B', 'tep-b', None, 'mismatch')]
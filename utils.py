@@ -1,3 +1,4 @@
+import json
 import requests
 import time
 import pandas as pd
@@ -15,6 +16,24 @@ query_template = """
     }
 }"""
 
+names_query_template = """
+{
+    queryScadaSignal(filter: { name: { in: $tag_names } }) {
+        name
+        tepId
+        metadata {
+            _provenanceRecordAuditRecordCreatedTimestamp
+        }
+    }
+}"""
+
+page_query_template = """
+{
+    queryScadaSignal(first: $first, offset: $offset) {
+        $fields
+    }
+}"""
+
 
 def get_access_token(scope):
     """Fetch the Azure access token for the Dgraph API."""
@@ -102,17 +121,122 @@ def get_metadata_for_tag(graphql_endpoint, scope, tag_name, max_retries=5):
     return []  # Return an empty list if all attempts fail
 
 
-def fetch_timestamps(graphql_endpoint, scope, df, source_column):
+def get_metadata_for_tags(graphql_endpoint, scope, tag_names, batch_size=500, max_retries=5):
+    """
+    Query Dgraph for the metadata of many tag names, batch_size names per query with a single access token.
+
+    The access token is regenerated when a batch fails with 401/403, a batch that still fails after
+    max_retries attempts is skipped.
+
+    Returns:
+    - dict: tag name -> records, the same records as get_metadata_for_tag, names without records left out.
+    """
+    tag_names = list(dict.fromkeys(tag_names))
+    if not tag_names:
+        return {}
+    access_token = get_access_token(scope)
+    if not access_token:
+        print("Failed to retrieve access token. Exiting function.")
+        return {}
+    session = requests.Session()
+    session.headers.update({'Authorization': f'Bearer {access_token}', 'Content-Type': 'application/json'})
+
+    records_by_name = {}
+    for start in range(0, len(tag_names), batch_size):
+        batch = tag_names[start:start + batch_size]
+        query = names_query_template.replace("$tag_names", json.dumps(batch))
+        for attempt in range(max_retries):
+            try:
+                response = session.post(graphql_endpoint, json={'query': query})
+                if response.status_code == 200:
+                    for record in (response.json().get('data') or {}).get('queryScadaSignal') or []:
+                        records_by_name.setdefault(record.pop('name'), []).append(record)
+                    break
+                print(f"Attempt {attempt + 1}/{max_retries} failed to fetch {len(batch)} tags from {batch[0]}. "
+                      f"Status Code: {response.status_code}, Response: {response.text}")
+                if response.status_code in (401, 403):
+                    session.headers['Authorization'] = f'Bearer {get_access_token(scope)}'
+            except requests.RequestException as e:
+                print(f"Error querying Dgraph for {len(batch)} tags from {batch[0]} on attempt {attempt + 1}: {e}")
+            if attempt + 1 < max_retries:
+                time.sleep(2)
+        else:
+            print(f"Max retries reached for {len(batch)} tags from {batch[0]}, they are left unresolved.")
+    return records_by_name
+
+
+def iter_scada_signals(graphql_endpoint, scope, fields="name tepId", page_size=10000, max_retries=5):
+    """
+    Page through all ScadaSignal records of Dgraph with first/offset, yielding one record dict at a time.
+
+    Parameters:
+    - fields (str): GraphQL selection of each record, e.g. "name tepId".
+    - page_size (int): Number of records per query.
+
+    The access token is fetched once and regenerated when a page fails with 401/403.
+    """
+    access_token = get_access_token(scope)
+    if not access_token:
+        raise RuntimeError("Failed to retrieve access token.")
+    session = requests.Session()
+    session.headers.update({'Authorization': f'Bearer {access_token}', 'Content-Type': 'application/json'})
+
+    offset = 0
+    while True:
+        query = page_query_template.replace("$first", str(page_size)).replace("$offset", str(offset)) \
+            .replace("$fields", fields)
+        attempts = 0
+        while True:
+            try:
+                response = session.post(graphql_endpoint, json={'query': query})
+                if response.status_code == 200:
+                    break
+                print(f"Attempt {attempts + 1}/{max_retries} failed to fetch page at offset {offset}. "
+                      f"Status Code: {response.status_code}, Response: {response.text}")
+                if response.status_code in (401, 403):
+                    session.headers['Authorization'] = f'Bearer {get_access_token(scope)}'
+            except requests.RequestException as e:
+                print(f"Error querying Dgraph page at offset {offset} on attempt {attempts + 1}: {e}")
+            attempts += 1
+            if attempts >= max_retries:
+                raise RuntimeError(f"Failed to fetch ScadaSignal page at offset {offset}")
+            time.sleep(2)
+
+        records = response.json().get('data', {}).get('queryScadaSignal', []) or []
+        yield from records
+        if len(records) < page_size:
+            return
+        offset += page_size
+
+
+def _metadata_lookup(graphql_endpoint, scope, tags, mode, snapshot=None):
+    """
+    Record lookup per tag, from a local snapshot join for large inputs (see scada_signal_snapshot.py). A snapshot
+    already loaded for the run is used as is.
+    """
+    from scada_signal_snapshot import get_signal_snapshot
+
+    if snapshot is None:
+        snapshot = get_signal_snapshot(graphql_endpoint, scope, tags, mode)
+    if snapshot is not None:
+        return snapshot, snapshot.get_metadata_for_tag
+    return None, lambda tag: get_metadata_for_tag(graphql_endpoint, scope, tag)
+
+
+def fetch_timestamps(graphql_endpoint, scope, df, source_column, mode="auto", snapshot=None):
     """
     Fetches timestamps for the specified column in the DataFrame.
 
     Parameters:
     - df (pd.DataFrame): The DataFrame to process.
     - source_column (str): The source column name to fetch timestamps from.
+    - mode (str): 'per_tag' queries, local 'snapshot' join, or 'auto' to pick by the number of tags.
+    - snapshot (ScadaSignalSnapshot): Snapshot already loaded for the run, used instead of loading one.
 
     Returns:
     - tuple: Start time, end time, and list of all fetched timestamps.
     """
+    _, lookup = _metadata_lookup(graphql_endpoint, scope, df[source_column], mode, snapshot)
     start_time = None
     end_time = None
     all_fetched_timestamps = []
@@ -121,7 +245,7 @@ def fetch_timestamps(graphql_endpoint, scope, df, source_column):
         tag = row[source_column]
         print(f"Querying for tag: {tag}")
 
-        metadata_records = get_metadata_for_tag(graphql_endpoint, scope, tag)
+        metadata_records = lookup(tag)
         print(f"metadata_records: '{metadata_records}':")
 
         # If metadata records are None or not a list, skip this tag
@@ -177,17 +301,30 @@ def fetch_timestamps(graphql_endpoint, scope, df, source_column):
     return df, start_time, end_time, all_fetched_timestamps
 
 
-def fetch_and_update_tepid(graphql_endpoint, scope, df, column_mappings):
+def fetch_and_update_tepid(graphql_endpoint, scope, df, column_mappings, mode="auto", snapshot=None):
     """
     Fetches tepId for specified columns in the DataFrame and updates new columns.
 
     Parameters:
     - df (pd.DataFrame): The DataFrame to process.
     - column_mappings (list of tuples): Each tuple contains (source_column_name, new_column_name).
+    - mode (str): 'per_tag' queries, local 'snapshot' join, or 'auto' to pick by the number of tags.
+    - snapshot (ScadaSignalSnapshot): Snapshot already loaded for the run, used instead of loading one.
 
     Returns:
     - pd.DataFrame: The updated DataFrame with new columns for tepId.
     """
+    tags = pd.concat([df[source_column] for source_column, _ in column_mappings])
+    snapshot, _ = _metadata_lookup(graphql_endpoint, scope, tags, mode, snapshot)
+    if snapshot is not None:
+        # hash join on the tag name against the snapshot
+        tep_ids = snapshot.tep_ids()
+        for source_column, new_column in column_mappings:
+            df[new_column] = df[source_column].map(tep_ids).astype(object)
+            df.loc[df[new_column].isna(), new_column] = None
+            print(f"Resolved {df[new_column].notna().sum()} of {len(df)} tags of '{source_column}' from the snapshot")
+        return df
+
     for source_column, new_column in column_mappings:
         df[new_column] = None
 